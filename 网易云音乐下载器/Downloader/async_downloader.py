@@ -0,0 +1,363 @@
+# async_downloader.py
+"""基于asyncio/aiohttp的网易云音乐下载器，适用于无界面的批量任务
+
+与 NetEaseMusicDownloader 共用基类 NetEaseMusicDownloaderBase (参数构造、加密、结果解析、缓存和断点记录)，
+网络方法均为协程，磁盘和SQLite操作在线程池中执行。歌单同步和分段下载只有同步版本提供。
+"""
+import asyncio
+import os
+import time
+
+import aiohttp
+
+try:
+    from Downloader.base import NetEaseMusicDownloaderBase, _UrlExpired
+    from Downloader.ratelimit import THROTTLE_STATUS
+    from Downloader.errors import NetEaseError, AuthError, ApiError, TransientError, Throttled, DownloadError
+    from Downloader.retry import backoff_delay, retry_call_async
+except ImportError:
+    from base import NetEaseMusicDownloaderBase, _UrlExpired
+    from ratelimit import THROTTLE_STATUS
+    from errors import NetEaseError, AuthError, ApiError, TransientError, Throttled, DownloadError
+    from retry import backoff_delay, retry_call_async
+
+
+class AsyncNetEaseMusicDownloader(NetEaseMusicDownloaderBase):
+    def __init__(self, crypto_backend='auto', session_key=False, key_rotation=600, payload_cache_size=128,
+                 limit=100, limit_per_host=20, chunk_size=64 * 1024, rate_limiter=None, api_retries=3,
+                 connect_timeout=5, read_timeout=15, tracer=None, dns_cache_ttl=300, **kwargs):
+        """limit: 连接池总连接数上限; limit_per_host: 每个主机的连接数上限;
+        dns_cache_ttl: 连接器缓存DNS结果的秒数 (0 表示不缓存)
+
+        其余参数 (search_cache_path、library_path、url_cache_ttl 等) 见 NetEaseMusicDownloaderBase
+        """
+        super().__init__(crypto_backend, session_key, key_rotation, payload_cache_size, chunk_size=chunk_size,
+                         rate_limiter=rate_limiter, api_retries=api_retries,
+                         connect_timeout=connect_timeout, read_timeout=read_timeout, tracer=tracer, **kwargs)
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self._stats = {}
+        # aiohttp会话必须在事件循环中创建，见 _get_session
+        self.session = None
+
+    async def _get_session(self):
+        """获取 (必要时创建) 带连接池的aiohttp会话"""
+        if self.session is None or self.session.closed:
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_request_start.append(self._on_request_start)
+            trace_config.on_connection_create_start.append(self._on_connection_create_start)
+            trace_config.on_connection_create_end.append(self._on_connection_create)
+            # DNS缓存由 aiohttp 连接器负责，有效期与同步版本一致
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host,
+                                             use_dns_cache=bool(self.dns_cache_ttl),
+                                             ttl_dns_cache=self.dns_cache_ttl or None)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                headers={'Connection': 'keep-alive'},
+                timeout=aiohttp.ClientTimeout(sock_connect=self.timeout[0], sock_read=self.timeout[1]),
+                trace_configs=[trace_config]
+            )
+        return self.session
+
+    async def prewarm(self, origins=None, connections=1):
+        """协程版预热: 并发向各源站发出HEAD请求，建立的连接留在连接池中"""
+        session = await self._get_session()
+
+        async def warm(origin):
+            with self.tracer.span('prewarm', origin=origin):
+                try:
+                    async with session.head(origin + '/', headers={'user-agent': self.headers['user-agent']},
+                                            allow_redirects=False):
+                        pass
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    pass
+
+        await asyncio.gather(*(warm(origin) for origin in origins or self.prewarm_origins()
+                               for _ in range(connections)))
+
+    async def _run_blocking(self, func, *args):
+        """在线程池中执行阻塞的磁盘和SQLite操作，不阻塞事件循环"""
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    def _part_offset(self, part_path):
+        """.part 文件的当前大小 (断点位置)"""
+        return os.path.getsize(part_path) if os.path.exists(part_path) else 0
+
+    def _host_stats(self, url):
+        """按主机汇总的连接统计"""
+        host = f"{url.scheme}://{url.host}:{url.port}"
+        return self._stats.setdefault(host, {'connections': 0, 'requests': 0, 'reused': 0})
+
+    async def _on_request_start(self, session, context, params):
+        context.host = params.url.host
+        context.host_stats = self._host_stats(params.url)
+        context.host_stats['requests'] += 1
+        context.host_stats['reused'] += 1
+
+    async def _on_connection_create_start(self, session, context, params):
+        context.connect_start = time.perf_counter()
+
+    async def _on_connection_create(self, session, context, params):
+        context.host_stats['connections'] += 1
+        context.host_stats['reused'] -= 1
+        self.tracer.record('connect', context.connect_start, time.perf_counter(), host=context.host)
+
+    def connection_stats(self):
+        """连接复用统计: 每个主机新建的连接数与发出的请求数"""
+        return {host: dict(stats) for host, stats in self._stats.items()}
+
+    async def close(self):
+        """关闭会话并释放连接池"""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+    async def __aenter__(self):
+        await self._get_session()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _post_weapi(self, url, i0x):
+        """加密参数并请求weapi接口，返回解析后的JSON (限流、重试和熔断见同步版本)"""
+        data = self._encrypt(i0x)
+        return await retry_call_async(lambda: self._post_weapi_once(url, data), self.api_retries,
+                                      self.backoff_base, self.backoff_max, self._breaker(url))
+    
+    async def _post_weapi_once(self, url, data):
+        """经过限流器发出一次weapi请求"""
+        session = await self._get_session()
+        async with self.rate_limiter.slot() as slot:
+            try:
+                async with session.post(url, headers=self.headers, data=data) as response:
+                    if response.status >= 500 and response.status not in THROTTLE_STATUS:
+                        raise TransientError(f"服务器错误: HTTP {response.status}")
+                    json_data = None
+                    if response.status not in THROTTLE_STATUS:
+                        try:
+                            json_data = await response.json(content_type=None)
+                        except ValueError as e:
+                            raise ApiError(f"接口返回了无效的数据: HTTP {response.status}") from e
+                    slot.throttled = self._is_throttled(response.status, json_data)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                raise TransientError(f"网络错误: {str(e)}") from e
+        if slot.throttled:
+            raise Throttled("请求过于频繁，请稍后重试")
+        return json_data
+
+    async def get_music_info(self, playlist_url=None):
+        """获取音乐信息，返回 [(歌曲ID, 歌曲名称)]"""
+        try:
+            return [(song['id'], song['name']) for song in await self.get_playlist(playlist_url)]
+        except NetEaseError:
+            raise
+        except Exception as e:
+            raise ApiError(f"获取音乐信息失败: {str(e)}") from e
+
+    async def get_playlist(self, playlist=None, with_details=True):
+        """通过歌单详情接口获取歌单/榜单的全部歌曲"""
+        if not self.cookies:
+            raise AuthError("请先设置Cookies")
+
+        playlist_id = self._parse_playlist_id(playlist)
+        try:
+            json_data = await self._post_weapi(self.PLAYLIST_API, self._playlist_params(playlist_id))
+            songs = self._parse_playlist(json_data)
+        except NetEaseError:
+            raise
+        except Exception as e:
+            raise ApiError(f"获取歌单失败: {str(e)}") from e
+
+        missing = [song['id'] for song in songs if 'name' not in song]
+        if missing:
+            if with_details:
+                details = await self.get_song_details(missing)
+            else:
+                details, _ = self._cached_song_details(missing)
+            for song in songs:
+                song.update(details.get(song['id'], {}))
+        return songs
+
+    async def get_song_details(self, music_ids, chunk_size=500):
+        """分批并发获取歌曲详情，返回 {歌曲ID: 歌曲信息}，已缓存的歌曲不再请求"""
+        if not self.cookies:
+            raise AuthError("请先设置Cookies")
+
+        details, missing = self._cached_song_details(music_ids)
+        chunks = [missing[start:start + chunk_size] for start in range(0, len(missing), chunk_size)]
+        try:
+            responses = await asyncio.gather(*[
+                self._post_weapi(self.SONG_DETAIL_API, self._song_detail_params(chunk)) for chunk in chunks
+            ])
+            for chunk, json_data in zip(chunks, responses):
+                details.update(self._parse_song_details(json_data, chunk))
+            return details
+        except NetEaseError:
+            raise
+        except Exception as e:
+            raise ApiError(f"获取歌曲详情失败: {str(e)}") from e
+
+    async def get_music_url(self, music_id):
+        """获取歌曲下载链接"""
+        info = (await self.get_music_urls([music_id]))[music_id]
+        return info['url'] if info else None
+
+    async def get_music_urls(self, music_ids, chunk_size=100, level='exhigh', refresh=False):
+        """批量获取歌曲下载链接，各分批请求并发发出"""
+        if not self.cookies:
+            raise AuthError("请先设置Cookies")
+
+        result, missing = self._cached_music_urls(music_ids, level, refresh)
+        chunks = [missing[start:start + chunk_size] for start in range(0, len(missing), chunk_size)]
+        async def resolve(chunk):
+            with self.tracer.span('resolve', songs=[str(mid) for mid in chunk]):
+                return await self._post_weapi(self.SONG_URL_API, self._song_url_params(chunk, level))
+
+        try:
+            responses = await asyncio.gather(*[resolve(chunk) for chunk in chunks])
+            for chunk, json_data in zip(chunks, responses):
+                result.update(self._store_music_urls(self._parse_song_urls(json_data, chunk), level))
+            return result
+        except NetEaseError:
+            raise
+        except Exception as e:
+            raise ApiError(f"获取音乐URL失败: {str(e)}") from e
+
+    async def search_music(self, keyword, offset=0, limit=30, search_type=1):
+        """搜索音乐，与同步版本共用搜索缓存"""
+        if not self.cookies:
+            raise AuthError("请先设置Cookies")
+
+        cache_key = self._search_cache_key(keyword, search_type, offset, limit)
+        search_info = await self._run_blocking(self.search_cache.get, cache_key)
+        if search_info is not None:
+            return [dict(song) for song in search_info]
+
+        try:
+            json_data = await self._post_weapi(self.SEARCH_API, self._search_params(keyword, offset, limit, search_type))
+            return await self._run_blocking(self._store_search_results, cache_key, json_data)
+        except NetEaseError:
+            raise
+        except Exception as e:
+            raise ApiError(f"搜索音乐失败: {str(e)}") from e
+
+    async def iter_search_pages(self, keyword, page_size=30, max_results=None, search_type=1):
+        """分页搜索异步生成器"""
+        offset = 0
+        while max_results is None or offset < max_results:
+            limit = page_size if max_results is None else min(page_size, max_results - offset)
+            page = await self.search_music(keyword, offset, limit, search_type)
+            if page:
+                yield page
+            if len(page) < limit:
+                return
+            offset += limit
+
+    async def download_music(self, music_title, music_url, download_path='music', chunk_size=None,
+                             music_id=None, size=None, md5=None, br=None, progress=None, level=None):
+        """流式下载音乐，支持断点续传 (与同步版本共用 .part 文件格式和曲库索引)"""
+        file_path = None
+        try:
+            record = await self._run_blocking(self._library_record, music_id)
+            if record:
+                return True, record['path']
+
+            music_title, file_path = await self._run_blocking(self._music_file_path, music_title, download_path,
+                                                              music_id)
+            part_path = file_path + '.part'
+            meta = await self._run_blocking(self._load_part_meta, part_path, music_url, music_id, size, md5, level)
+            meta['br'] = br or meta.get('br')
+
+            cdn = self.breakers['cdn']
+            attempts = 0
+            while True:
+                cdn.allow()
+                try:
+                    await self._fetch_part(part_path, meta, chunk_size or self.chunk_size, progress)
+                    cdn.record_success()
+                    break
+                except _UrlExpired:
+                    cdn.record_success()
+                    if music_id is None or attempts >= self.resume_retries:
+                        raise DownloadError("下载链接已失效")
+                    url_info = (await self.get_music_urls([music_id], level=meta['level'], refresh=True))[music_id]
+                    await self._run_blocking(self._refresh_part_url, part_path, meta, url_info)
+                except (aiohttp.ClientPayloadError, aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                    cdn.record_failure()
+                    if attempts >= self.resume_retries:
+                        raise
+                    await asyncio.sleep(backoff_delay(attempts, self.backoff_base, self.backoff_max))
+                except Exception:
+                    cdn.record_success()
+                    raise
+                attempts += 1
+
+            await self._run_blocking(self._finish_part, part_path, file_path, meta)
+            return True, file_path
+
+        except Exception as e:
+            return False, f"下载失败: {str(e)}"
+        finally:
+            self._release_path(file_path)
+
+    async def _fetch_part(self, part_path, meta, chunk_size, progress=None):
+        """从 .part 文件当前大小处继续下载，文件操作在线程池中执行"""
+        offset = await self._run_blocking(self._part_offset, part_path)
+        if meta['size'] and offset >= meta['size']:
+            return
+
+        headers = {'Range': f'bytes={offset}-'} if offset else {}
+        session = await self._get_session()
+        tracer = self.tracer
+        request_start = time.perf_counter()
+        async with session.get(meta['url'], headers=headers) as response:
+            # 异步版本的首字节时间包含建立连接的时间
+            tracer.record('ttfb', request_start, time.perf_counter(), song=meta['id'])
+            if response.status in (403, 404, 410):
+                raise _UrlExpired()
+            if response.status == 416:
+                # 断点超出文件范围，清除后从头下载
+                await self._run_blocking(os.remove, part_path)
+                raise aiohttp.ClientConnectionError("断点无效，重新下载")
+            if response.status >= 500:
+                # CDN暂时故障，按网络错误退避重试
+                raise aiohttp.ClientConnectionError(f"服务器错误: HTTP {response.status}")
+            response.raise_for_status()
+            if response.status != 206:
+                # 服务器不支持Range，从头下载
+                offset = 0
+            if not meta['size']:
+                meta['size'] = self._content_total(response.headers, offset)
+                await self._run_blocking(self._save_part_meta, part_path, meta)
+
+            received = offset
+            if progress:
+                progress(received, meta['size'])
+            transfer_start = time.perf_counter()
+            write_time = 0.0
+            f = await self._run_blocking(open, part_path, 'ab' if offset else 'wb')
+            try:
+                async for chunk in response.content.iter_chunked(chunk_size):
+                    if tracer.enabled:
+                        write_start = time.perf_counter()
+                        await self._run_blocking(f.write, chunk)
+                        write_time += time.perf_counter() - write_start
+                    else:
+                        await self._run_blocking(f.write, chunk)
+                    received += len(chunk)
+                    if progress:
+                        progress(received, meta['size'])
+            finally:
+                await self._run_blocking(f.close)
+            if tracer.enabled:
+                self._trace_transfer(meta['id'], transfer_start, write_time, received - offset)
+
+    async def validate_cookies(self):
+        """验证Cookies是否有效"""
+        try:
+            session = await self._get_session()
+            async with session.get(self.TOPLIST_URL, headers=self.headers) as response:
+                return response.status == 200
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return False
@@ -0,0 +1,470 @@
+# base.py
+"""同步和异步下载器共用的基类
+
+不涉及网络请求的部分: 配置、weapi加密、请求参数构造、响应解析、链接/搜索/元数据缓存、
+曲库索引和 .part 断点记录。网络请求由 NetEaseMusicDownloader (requests) 和
+AsyncNetEaseMusicDownloader (aiohttp) 各自实现。
+"""
+import re
+import os
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+from pprint import pprint
+
+try:
+    from Downloader.weapi import create_crypto, dumps
+    from Downloader.cache import LRUCache, TTLCache, SQLiteCache, TieredCache
+    from Downloader.library import LibraryIndex, file_md5, with_id_suffix
+    from Downloader.ratelimit import AdaptiveRateLimiter, THROTTLE_STATUS, THROTTLE_CODES
+    from Downloader.errors import NetEaseError, ApiError, DownloadError
+    from Downloader.retry import CircuitBreaker
+    from Downloader.tracing import NULL_TRACER
+    from Downloader.paths import CACHE_DIR
+except ImportError:
+    from weapi import create_crypto, dumps
+    from cache import LRUCache, TTLCache, SQLiteCache, TieredCache
+    from library import LibraryIndex, file_md5, with_id_suffix
+    from ratelimit import AdaptiveRateLimiter, THROTTLE_STATUS, THROTTLE_CODES
+    from errors import NetEaseError, ApiError, DownloadError
+    from retry import CircuitBreaker
+    from tracing import NULL_TRACER
+    from paths import CACHE_DIR
+
+
+class _UrlExpired(Exception):
+    """下载链接过期或被拒绝"""
+
+
+class NetEaseMusicDownloaderBase:
+    """下载器基类，不直接使用"""
+    # 默认榜单 (热歌榜)
+    TOPLIST_URL = 'http://music.163.com/discover/toplist?id=3778678'
+    TOPLIST_ID = '3778678'
+    # 歌单详情接口
+    PLAYLIST_API = 'https://music.163.com/weapi/v6/playlist/detail'
+    # 歌曲详情接口
+    SONG_DETAIL_API = 'https://music.163.com/weapi/v3/song/detail'
+    # 歌曲链接接口
+    SONG_URL_API = 'https://music.163.com/weapi/song/enhance/player/url/v1'
+    # 搜索接口
+    SEARCH_API = 'https://music.163.com/weapi/cloudsearch/get/web'
+    # 链接缓存提前失效的秒数，避免拿到即将过期的链接
+    URL_EXPIRY_MARGIN = 30
+    # 各接口所属的熔断端点，其余weapi接口归入 'api'，下载归入 'cdn'
+    ENDPOINTS = {SEARCH_API: 'search', SONG_URL_API: 'url'}
+    # 预热连接的CDN源站 (歌曲链接大多指向这些主机)
+    CDN_ORIGINS = ('http://m701.music.126.net', 'http://m801.music.126.net')
+    
+    def __init__(self, crypto_backend='auto', session_key=False, key_rotation=600, payload_cache_size=128,
+                 chunk_size=64 * 1024, resume_retries=3, url_cache_ttl=600,
+                 search_cache_path=os.path.join(CACHE_DIR, 'search_cache.db'), search_cache_ttl=3600,
+                 search_cache_size=256, search_cache_max_bytes=32 * 1024 * 1024, metadata_cache_size=10000,
+                 library_path=os.path.join(CACHE_DIR, 'library.db'), rate_limiter=None, api_retries=3, backoff_base=0.5,
+                 backoff_max=8.0, connect_timeout=5, read_timeout=15, breaker_threshold=5, breaker_reset=30,
+                 tracer=None):
+        # weapi加密后端，首次使用时才创建 (见 crypto)
+        self._crypto = None
+        self._crypto_lock = threading.Lock()
+        # 分阶段耗时记录 (见 tracing.py)，默认不记录
+        self.tracer = tracer or NULL_TRACER
+        # 流式下载时每次写入的块大小 (字节)
+        self.chunk_size = chunk_size
+        # 传输中断或链接过期后的续传次数
+        self.resume_retries = resume_retries
+        self.cookies = None
+        # 加密结果缓存，键为请求体
+        self.payload_cache = LRUCache(payload_cache_size)
+        # 歌曲链接缓存，键为 (歌曲ID, 音质)，按接口返回的有效期过期
+        self.url_cache = TTLCache(default_ttl=url_cache_ttl)
+        # 搜索结果缓存: 内存LRU + SQLite磁盘缓存 (search_cache_path 为 None 时只用内存)
+        self.search_cache = TieredCache(
+            TTLCache(default_ttl=search_cache_ttl, maxsize=search_cache_size),
+            SQLiteCache(search_cache_path, ttl=search_cache_ttl, max_bytes=search_cache_max_bytes)
+            if search_cache_path else None
+        )
+        # 歌曲元数据缓存，搜索、歌单和歌曲详情的结果共用，键为歌曲ID
+        self.metadata_cache = LRUCache(metadata_cache_size)
+        # 本地曲库索引，记录已下载的歌曲 (library_path 为 None 时不启用)
+        self.library = LibraryIndex(library_path) if library_path else None
+        # 正在下载的目标文件 {路径: 歌曲ID}，并发下载同名歌曲时避免共用同一个 .part 文件
+        self._reserved_paths = {}
+        self._path_lock = threading.Lock()
+        # 所有weapi请求共用的自适应限流器 (可传入同一个实例让多个下载器共用)
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        # weapi请求遇到超时、连接失败、5xx或限流时的重试次数，重试间隔为带抖动的指数退避
+        self.api_retries = api_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # 所有请求的 (连接超时, 读取超时) 秒数
+        self.timeout = (connect_timeout, read_timeout)
+        # 按端点熔断: 连续 breaker_threshold 次网络错误后 breaker_reset 秒内直接失败
+        self.breakers = {name: CircuitBreaker(name, breaker_threshold, breaker_reset)
+                         for name in ('search', 'url', 'api', 'cdn')}
+        self.headers = {
+            'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/141.0.0.0 Safari/537.36 Edg/141.0.0.0'
+        }
+        self._load_crypto(crypto_backend, session_key, key_rotation)
+    
+    def prewarm_origins(self):
+        """需要预热的源站: 各接口所在的主机及常用CDN主机"""
+        origins = []
+        for url in (self.TOPLIST_URL, self.PLAYLIST_API, self.SONG_DETAIL_API, self.SONG_URL_API,
+                    self.SEARCH_API) + tuple(self.CDN_ORIGINS):
+            parts = urlsplit(url)
+            origin = f"{parts.scheme}://{parts.netloc}"
+            if origin not in origins:
+                origins.append(origin)
+        return origins
+    
+    def _load_crypto(self, backend, session_key=False, key_rotation=600):
+        """设置weapi加密后端 (默认纯Python, execjs作为备用)，实际加载推迟到首次使用"""
+        self._crypto_args = (backend, session_key, key_rotation)
+        self._crypto = None
+    
+    @property
+    def crypto(self):
+        """weapi加密后端，首次访问时创建 (execjs后端需要编译wangyi.js)"""
+        if self._crypto is None:
+            with self._crypto_lock:
+                if self._crypto is None:
+                    backend, session_key, key_rotation = self._crypto_args
+                    self._crypto = create_crypto(backend, session_key=session_key, key_rotation=key_rotation)
+        return self._crypto
+    
+    def warm_up(self):
+        """预先加载加密后端，供后台线程在首次请求前调用"""
+        return self.crypto
+    
+    def _encrypt(self, i0x):
+        """加密weapi请求参数，相同请求体直接复用缓存结果"""
+        body = dumps(i0x)
+        data = self.payload_cache.get(body)
+        if data is None:
+            with self.tracer.span('encrypt', backend=self.crypto.name):
+                data = self.crypto.encrypt(i0x)
+            self.payload_cache.set(body, data)
+        return dict(data)
+    
+    def set_cookies(self, cookies):
+        """设置Cookies"""
+        self.cookies = cookies
+        self.headers['cookie'] = cookies
+    
+    def _breaker(self, url):
+        """返回接口所属端点的熔断器"""
+        return self.breakers[self.ENDPOINTS.get(url, 'api')]
+    
+    def _is_throttled(self, status, json_data):
+        """判断响应是否为限流"""
+        return status in THROTTLE_STATUS or (isinstance(json_data, dict) and json_data.get('code') in THROTTLE_CODES)
+    
+    def show_search_results(self, search_info):
+        """显示搜索结果"""
+        from prettytable import PrettyTable
+        table = PrettyTable()
+        table.field_names = ["序号", "歌曲名称", "歌手", "专辑", "时长"]
+        
+        for index, song in enumerate(search_info):
+            table.add_row([index, song['name'], song['artist'], song['album'], song['duration']])
+        
+        pprint(table)
+        return table
+
+    def _trace_transfer(self, music_id, transfer_start, write_time, size):
+        """记录接收文件内容的时间，其中累计的写盘时间 (分散在各数据块之间) 作为 write 属性"""
+        self.tracer.record('transfer', transfer_start, time.perf_counter(), song=music_id, bytes=size,
+                           write=round(write_time, 6))
+    
+    def _load_part_meta(self, part_path, music_url, music_id, size, md5, level=None):
+        """读取断点记录；与本次下载不是同一首歌时丢弃旧的 .part 文件"""
+        meta_path = part_path + '.json'
+        meta = {}
+        if os.path.exists(part_path) and os.path.exists(meta_path):
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                meta = {}
+            same = (
+                (md5 and meta.get('md5') == md5)
+                or (music_id is not None and meta.get('id') == str(music_id))
+                or meta.get('url') == music_url
+            )
+            if not same:
+                meta = {}
+        if not meta and os.path.exists(part_path):
+            os.remove(part_path)
+        
+        meta.update({
+            'id': str(music_id) if music_id is not None else meta.get('id'),
+            'url': music_url,
+            'size': size or meta.get('size'),
+            'md5': md5 or meta.get('md5'),
+            'level': level or meta.get('level') or 'exhigh'
+        })
+        self._save_part_meta(part_path, meta)
+        return meta
+    
+    def _save_part_meta(self, part_path, meta):
+        """写入断点记录"""
+        with open(part_path + '.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+    
+    def _refresh_part_url(self, part_path, meta, url_info):
+        """用重新解析的链接更新断点记录
+
+        新链接的大小或md5与断点记录不同时 (已是另一个文件)，清空 .part 和分段进度，从头下载
+        """
+        if not url_info:
+            raise DownloadError("下载链接已失效")
+        size, md5 = url_info.get('size'), url_info.get('md5')
+        if (size and meta['size'] and size != meta['size']) or \
+                (md5 and meta['md5'] and md5.lower() != meta['md5'].lower()):
+            if os.path.exists(part_path):
+                open(part_path, 'wb').close()
+            meta.pop('segments', None)
+        meta['url'] = url_info['url']
+        meta['size'] = size or meta['size']
+        meta['md5'] = md5 or meta['md5']
+        self._save_part_meta(part_path, meta)
+    
+    def _content_total(self, headers, offset):
+        """从响应头推算文件总大小"""
+        content_range = headers.get('Content-Range', '')
+        if '/' in content_range and not content_range.endswith('*'):
+            return int(content_range.rsplit('/', 1)[1])
+        if headers.get('Content-Length'):
+            return offset + int(headers['Content-Length'])
+        return None
+    
+    def _finish_part(self, part_path, file_path, meta):
+        """校验大小和md5后将 .part 重命名为目标文件"""
+        actual_size = os.path.getsize(part_path)
+        if meta['size'] and actual_size != meta['size']:
+            raise DownloadError(f"文件不完整: {actual_size}/{meta['size']} 字节")
+        if meta['md5'] and file_md5(part_path) != meta['md5'].lower():
+            os.remove(part_path)
+            os.remove(part_path + '.json')
+            raise DownloadError("md5校验失败")
+        
+        os.replace(part_path, file_path)
+        os.remove(part_path + '.json')
+        if self.library is not None and meta['id'] is not None:
+            self.library.add(meta['id'], file_path, actual_size, meta.get('br'), meta['md5'])
+    
+    def _library_record(self, music_id):
+        """返回曲库中该歌曲的有效记录"""
+        if self.library is None or music_id is None:
+            return None
+        return self.library.get(music_id)
+    
+    def find_downloaded(self, music_ids):
+        """批量查询曲库，返回 {歌曲ID: 记录}，用于批量任务在解析链接前跳过已下载的歌曲"""
+        if self.library is None:
+            return {}
+        return self.library.find(music_ids)
+    
+    def rebuild_library(self, download_path='music', songs=None):
+        """扫描下载目录重建曲库索引，返回记录数"""
+        if self.library is None:
+            raise NetEaseError("未启用曲库索引")
+        return self.library.rebuild(download_path, songs)
+    
+    def _parse_playlist_id(self, playlist):
+        """从歌单ID或歌单/榜单链接中提取歌单ID"""
+        if not playlist:
+            return self.TOPLIST_ID
+        playlist = str(playlist).strip()
+        if playlist.isdigit():
+            return playlist
+        match = re.search(r'[?&]id=(\d+)', playlist)
+        if not match:
+            raise ApiError(f"无法从链接中解析歌单ID: {playlist}")
+        return match.group(1)
+    
+    def _playlist_params(self, playlist_id, n=1000):
+        """构造歌单详情接口的加密前参数，n 为内嵌详情的歌曲数"""
+        return {
+            "id": str(playlist_id),
+            "offset": "0",
+            "total": "true",
+            "limit": str(n),
+            "n": str(n),
+            "csrf_token": self._extract_csrf_token()
+        }
+    
+    def _parse_playlist(self, json_data):
+        """按 trackIds 顺序返回歌曲列表，未内嵌详情的歌曲只有 'id'"""
+        if json_data.get('code') != 200 or not json_data.get('playlist'):
+            raise ApiError(json_data.get('message') or f"接口返回错误: {json_data.get('code')}", json_data.get('code'))
+        playlist = json_data['playlist']
+        tracks = {track['id']: self._parse_song(track) for track in playlist.get('tracks') or []}
+        track_ids = [item['id'] for item in playlist.get('trackIds') or []] or list(tracks)
+        return [tracks.get(mid) or {'id': mid} for mid in track_ids]
+    
+    def _song_detail_params(self, music_ids):
+        """构造歌曲详情接口的加密前参数"""
+        return {
+            "c": dumps([{"id": str(mid)} for mid in music_ids]),
+            "ids": "[" + ",".join(str(mid) for mid in music_ids) + "]",
+            "csrf_token": self._extract_csrf_token()
+        }
+    
+    def _parse_song_details(self, json_data, music_ids):
+        """解析歌曲详情接口，返回 {请求的歌曲ID: 歌曲信息}"""
+        found = {str(song['id']): self._parse_song(song) for song in json_data.get('songs') or []}
+        return {mid: dict(found[str(mid)], id=mid) for mid in music_ids if str(mid) in found}
+    
+    def _parse_song(self, song):
+        """把接口中的歌曲对象转换为表格使用的格式，并写入元数据缓存"""
+        info = {
+            'id': song['id'],
+            'name': song['name'],
+            'artist': '/'.join([artist['name'] for artist in song.get('ar') or []]),
+            'album': (song.get('al') or {}).get('name', ''),
+            'duration': self._format_duration(song.get('dt', 0) // 1000)
+        }
+        self.metadata_cache.set(str(song['id']), info)
+        return dict(info)
+    
+    def _cached_song_details(self, music_ids):
+        """从元数据缓存中取歌曲详情，返回 (已缓存详情, 需要请求的歌曲ID列表)"""
+        details = {}
+        missing = []
+        for mid in music_ids:
+            info = self.metadata_cache.get(str(mid))
+            if info:
+                details[mid] = dict(info, id=mid)
+            else:
+                missing.append(mid)
+        return details, missing
+    
+    def _song_url_params(self, music_ids, level):
+        """构造歌曲链接接口的加密前参数"""
+        return {
+            "ids": "[" + ",".join(str(mid) for mid in music_ids) + "]",
+            "level": level,
+            "encodeType": "aac",
+            "csrf_token": self._extract_csrf_token()
+        }
+    
+    def _parse_song_urls(self, json_data, music_ids):
+        """提取歌曲下载链接，返回 {歌曲ID: 链接信息或None}"""
+        found = {}
+        for item in json_data.get('data') or []:
+            if item.get('url'):
+                found[str(item['id'])] = {
+                    'url': item['url'],
+                    'size': item.get('size'),
+                    'md5': item.get('md5'),
+                    'br': item.get('br'),
+                    'expi': item.get('expi')
+                }
+        return {mid: found.get(str(mid)) for mid in music_ids}
+    
+    def _cached_music_urls(self, music_ids, level, refresh=False):
+        """从链接缓存中取结果，返回 (已缓存结果, 需要请求的歌曲ID列表)"""
+        result = {}
+        missing = []
+        for mid in music_ids:
+            info = None if refresh else self.url_cache.get((str(mid), level))
+            if info:
+                result[mid] = info
+            else:
+                missing.append(mid)
+        return result, missing
+    
+    def _store_music_urls(self, url_infos, level):
+        """按接口返回的有效期 (expi, 秒) 缓存可用的链接"""
+        for mid, info in url_infos.items():
+            if info:
+                # 记下音质，链接过期后按同一音质重新解析
+                info['level'] = level
+                ttl = info['expi'] - self.URL_EXPIRY_MARGIN if info.get('expi') else None
+                self.url_cache.set((str(mid), level), info, ttl)
+        return url_infos
+    
+    def _search_params(self, keyword, offset=0, limit=30, search_type=1):
+        """构造搜索接口的加密前参数"""
+        return {
+            "hlpretag": "<span class=\"s-fc7\">",
+            "hlposttag": "</span>",
+            "s": keyword,
+            "type": str(search_type),
+            "offset": str(offset),
+            "total": "true",
+            "limit": str(limit),
+            "csrf_token": self._extract_csrf_token()
+        }
+    
+    def _search_cache_key(self, keyword, search_type, offset, limit):
+        """搜索缓存键: 关键词去除多余空白并转小写"""
+        return dumps([' '.join(keyword.split()).lower(), str(search_type), int(offset), int(limit)])
+    
+    def _store_search_results(self, cache_key, json_data):
+        """解析搜索结果，接口返回成功时写入缓存"""
+        search_info = self._parse_search_results(json_data)
+        if json_data.get('code') == 200:
+            self.search_cache.set(cache_key, search_info)
+        return search_info
+    
+    def _parse_search_results(self, json_data):
+        """解析搜索结果"""
+        search_info = []
+        if 'result' in json_data and 'songs' in json_data['result']:
+            for song in json_data['result']['songs']:
+                search_info.append(self._parse_song(song))
+        return search_info
+    
+    def _music_file_path(self, music_title, download_path, music_id=None):
+        """创建下载目录，预留并返回 (清理后的标题, 文件路径)，下载结束后由 _release_path 释放
+
+        同名文件已被曲库中另一首歌占用，或正被另一个下载任务使用时，文件名加上 " [id=歌曲ID]" 后缀
+        (没有歌曲ID时加序号 " (2)"，曲库重建时不会把序号当作歌曲ID)
+        """
+        # 自动创建文件夹
+        os.makedirs(download_path, exist_ok=True)
+        
+        # 清理文件名中的非法字符
+        music_title = re.sub(r'[\\/*?:"<>|]', '', music_title)
+        owner_id = str(music_id) if music_id is not None else None
+        base_title = music_title
+        file_path = os.path.join(download_path, music_title + '.mp3')
+        if self.library is not None and owner_id is not None:
+            owner = self.library.owner(file_path)
+            if owner is not None and owner != owner_id:
+                music_title = with_id_suffix(base_title, music_id)
+                file_path = os.path.join(download_path, music_title + '.mp3')
+        
+        with self._path_lock:
+            number = 1
+            while file_path in self._reserved_paths and (owner_id is None or
+                                                         self._reserved_paths[file_path] != owner_id):
+                number += 1
+                music_title = with_id_suffix(base_title, music_id) if owner_id is not None and number == 2 \
+                    else f"{base_title} ({number})"
+                file_path = os.path.join(download_path, music_title + '.mp3')
+            self._reserved_paths[file_path] = owner_id
+        return music_title, file_path
+    
+    def _release_path(self, file_path):
+        """释放 _music_file_path 预留的文件路径"""
+        if file_path is not None:
+            with self._path_lock:
+                self._reserved_paths.pop(file_path, None)
+    
+    def _extract_csrf_token(self):
+        """从cookies中提取csrf token"""
+        if self.cookies and '__csrf' in self.cookies:
+            match = re.search(r'__csrf=([^;]+)', self.cookies)
+            if match:
+                return match.group(1)
+        return ''
+    
+    def _format_duration(self, seconds):
+        """格式化时长"""
+        minutes = seconds // 60
+        seconds = seconds % 60
+        return f"{minutes:02d}:{seconds:02d}"
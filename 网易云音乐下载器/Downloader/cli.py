@@ -0,0 +1,227 @@
+# cli.py
+"""无界面批量下载命令行
+
+    python -m Downloader.cli --cookies-file cookies.txt --toplist --playlist 19723756 --ids-file ids.txt -j 8
+
+Cookies 依次取自 --cookies、--cookies-file、环境变量 NETEASE_COOKIES。
+每首歌曲的结果以一行JSON写到 --results (默认标准输出)，全部完成后向标准错误输出汇总JSON；
+有失败的歌曲时退出码为 1。
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+try:
+    from Downloader.downloader import NetEaseMusicDownloader
+    from Downloader.scheduler import DownloadScheduler
+    from Downloader.errors import NetEaseError
+    from Downloader.tracing import create_tracer
+except ImportError:
+    from downloader import NetEaseMusicDownloader
+    from scheduler import DownloadScheduler
+    from errors import NetEaseError
+    from tracing import create_tracer
+
+COOKIES_ENV = 'NETEASE_COOKIES'
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='网易云音乐批量下载 (无界面)')
+    parser.add_argument('--cookies', help='Cookies字符串')
+    parser.add_argument('--cookies-file', help='保存Cookies的文件')
+    parser.add_argument('--song', action='append', type=int, default=[], help='歌曲ID，可重复')
+    parser.add_argument('--playlist', action='append', default=[], help='歌单ID或链接，可重复')
+    parser.add_argument('--toplist', action='append', nargs='?', const=NetEaseMusicDownloader.TOPLIST_ID,
+                        default=[], help='榜单ID，省略时为热歌榜，可重复')
+    parser.add_argument('--ids-file', help='每行一个歌曲ID的文件，"-" 表示标准输入')
+    parser.add_argument('-o', '--output', default='music', help='下载目录 (默认 music)')
+    parser.add_argument('-j', '--jobs', type=int, default=8, help='并发下载数 (默认 8)')
+    parser.add_argument('--batch-size', type=int, default=500, help='每批解析详情和链接的歌曲数 (默认 500)')
+    parser.add_argument('--level', default='exhigh', help='音质 (默认 exhigh)')
+    parser.add_argument('--segments', type=int, default=1, help='大文件分段并行下载的段数 (默认 1)')
+    parser.add_argument('--results', help='JSON-lines结果文件 (默认标准输出)')
+    parser.add_argument('--trace-summary', action='store_true', help='结束时向标准错误输出各阶段耗时汇总')
+    parser.add_argument('--trace-jsonl', help='各阶段耗时写入JSON-lines文件')
+    parser.add_argument('--trace-chrome', help='各阶段耗时写入Chrome trace文件')
+    args = parser.parse_args(argv)
+    if not (args.song or args.playlist or args.toplist or args.ids_file):
+        parser.error('至少需要 --song、--playlist、--toplist 或 --ids-file 之一')
+    return args
+
+
+def load_cookies(args):
+    """按 --cookies、--cookies-file、环境变量的顺序读取Cookies"""
+    if args.cookies:
+        return args.cookies.strip()
+    if args.cookies_file:
+        with open(args.cookies_file, 'r', encoding='utf-8') as f:
+            return f.read().strip()
+    return os.environ.get(COOKIES_ENV, '').strip()
+
+
+def iter_ids_file(path, on_invalid=None):
+    """逐行读取歌曲ID，忽略空行和 # 注释
+
+    不是数字的行不会产生歌曲 (否则会让同一批的请求整体失败)，而是以 (内容, 行号) 调用 on_invalid
+    """
+    f = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+    try:
+        for lineno, line in enumerate(f, 1):
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            if re.fullmatch(r'[0-9]+', line):
+                yield {'id': int(line)}
+            elif on_invalid:
+                on_invalid(line, lineno)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def iter_songs(downloader, args, on_invalid=None, on_error=None):
+    """按命令行参数依次产生待下载的歌曲，重复的ID只产生一次；ID文件中的无效行交给 on_invalid
+
+    获取某个歌单/榜单失败时以 (歌单, 异常) 调用 on_error 并继续读取其余来源，没有 on_error 时抛出异常
+    """
+    def sources():
+        for song_id in args.song:
+            yield [{'id': song_id}]
+        for playlist in args.toplist + args.playlist:
+            try:
+                songs = downloader.get_playlist(playlist, with_details=False)
+            except NetEaseError as e:
+                if on_error is None:
+                    raise
+                on_error(playlist, e)
+                continue
+            yield songs
+        if args.ids_file:
+            yield iter_ids_file(args.ids_file, on_invalid)
+
+    seen = set()
+    for songs in sources():
+        for song in songs:
+            if song['id'] not in seen:
+                seen.add(song['id'])
+                yield song
+
+
+def iter_batches(songs, size):
+    batch = []
+    for song in songs:
+        batch.append(song)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class BatchRunner:
+    """分批解析详情和链接，交给调度器并发下载，并逐首写出结果"""
+
+    def __init__(self, downloader, scheduler, out, level='exhigh'):
+        self.downloader = downloader
+        self.scheduler = scheduler
+        self.out = out
+        self.level = level
+        self.summary = {'total': 0, 'downloaded': 0, 'skipped': 0, 'failed': 0}
+        self._lock = threading.Lock()
+
+    def emit(self, result):
+        """写出一行结果并计入汇总"""
+        with self._lock:
+            self.summary['total'] += 1
+            self.summary[result['status']] += 1
+            self.out.write(json.dumps(result, ensure_ascii=False) + '\n')
+            self.out.flush()
+
+    def run_batch(self, songs):
+        """下载一批歌曲，全部完成后返回"""
+        ids = [song['id'] for song in songs]
+        try:
+            downloaded = self.downloader.find_downloaded(ids)
+            pending = [mid for mid in ids if mid not in downloaded]
+            details = self.downloader.get_song_details([song['id'] for song in songs
+                                                        if 'name' not in song and song['id'] in pending])
+            music_urls = self.downloader.get_music_urls(pending, level=self.level)
+        except NetEaseError as e:
+            for song in songs:
+                self.emit({'id': song['id'], 'name': song.get('name'), 'status': 'failed', 'error': str(e)})
+            return
+
+        started = time.monotonic()
+        finished = threading.Event()
+
+        def on_complete(song, success, message, done, total):
+            result = {'id': song['id'], 'name': song['name']}
+            if song['id'] in downloaded:
+                result.update(status='skipped', path=downloaded[song['id']]['path'])
+            elif success:
+                url_info = music_urls.get(song['id']) or {}
+                result.update(status='downloaded', path=message, size=url_info.get('size'), br=url_info.get('br'),
+                              elapsed=round(time.monotonic() - started, 3))
+            else:
+                result.update(status='failed', error=message)
+            self.emit(result)
+
+        jobs = []
+        for song in songs:
+            song = dict(song, **details.get(song['id'], {}))
+            song['name'] = song.get('name') or str(song['id'])
+            jobs.append((song, music_urls.get(song['id'])))
+        self.scheduler.submit(jobs, on_complete=on_complete, on_finished=lambda batch: finished.set(),
+                              downloaded=downloaded)
+        finished.wait()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    cookies = load_cookies(args)
+    if not cookies:
+        print(f"未提供Cookies，请使用 --cookies、--cookies-file 或环境变量 {COOKIES_ENV}", file=sys.stderr)
+        return 2
+
+    tracer = create_tracer(args.trace_summary, args.trace_jsonl, args.trace_chrome)
+    downloader = NetEaseMusicDownloader(segments=args.segments, pool_maxsize=max(10, args.jobs), tracer=tracer)
+    downloader.set_cookies(cookies)
+    downloader.prewarm()
+    scheduler = DownloadScheduler(downloader, max_workers=args.jobs, download_path=args.output)
+    out = open(args.results, 'a', encoding='utf-8') if args.results else sys.stdout
+    runner = BatchRunner(downloader, scheduler, out, args.level)
+
+    def on_invalid(value, lineno):
+        runner.emit({'id': value, 'name': None, 'status': 'failed', 'error': f"无效的歌曲ID (第 {lineno} 行)"})
+
+    def on_error(playlist, error):
+        runner.emit({'playlist': playlist, 'name': None, 'status': 'failed', 'error': str(error)})
+
+    started = time.monotonic()
+    try:
+        for batch in iter_batches(iter_songs(downloader, args, on_invalid, on_error), args.batch_size):
+            runner.run_batch(batch)
+    except NetEaseError as e:
+        runner.summary['error'] = str(e)
+    except KeyboardInterrupt:
+        runner.summary['error'] = 'interrupted'
+    finally:
+        scheduler.shutdown()
+        downloader.close()
+        tracer.close()
+        if out is not sys.stdout:
+            out.close()
+
+    runner.summary['elapsed'] = round(time.monotonic() - started, 3)
+    if tracer.summary():
+        print(tracer.summary(), file=sys.stderr)
+    print(json.dumps(runner.summary, ensure_ascii=False), file=sys.stderr)
+    return 1 if runner.summary['failed'] or 'error' in runner.summary else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,182 +1,589 @@
 # netease_downloader.py
 import requests
-import re
-import execjs
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
 from pprint import pprint
-from prettytable import PrettyTable
 
-class NetEaseMusicDownloader:
-    def __init__(self):
-        self.js_code = None
-        self.cookies = None
-        self.headers = {
-            'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/141.0.0.0 Safari/537.36 Edg/141.0.0.0'
-        }
-        self._load_js_code()
-    
-    def _load_js_code(self):
-        """加载并编译JS加密代码"""
-        try:
-            self.js_code = execjs.compile(open('Downloader/wangyi.js', 'r', encoding='utf-8').read())
-        except FileNotFoundError:
-            raise Exception("网易.js文件未找到，请确保加密文件存在")
-        except Exception as e:
-            raise Exception(f"加载JS加密代码失败: {str(e)}")
+try:
+    from Downloader.base import NetEaseMusicDownloaderBase, _UrlExpired
+    from Downloader.scheduler import DownloadScheduler
+    from Downloader.ratelimit import THROTTLE_STATUS
+    from Downloader.errors import NetEaseError, AuthError, ApiError, TransientError, Throttled, DownloadError
+    from Downloader.retry import backoff_delay, retry_call
+    from Downloader.tracing import install_connect_timing, pop_connect_time
+    from Downloader.resolver import DNSCache, install_dns_cache
+    from Downloader.paths import CACHE_DIR
+except ImportError:
+    from base import NetEaseMusicDownloaderBase, _UrlExpired
+    from scheduler import DownloadScheduler
+    from ratelimit import THROTTLE_STATUS
+    from errors import NetEaseError, AuthError, ApiError, TransientError, Throttled, DownloadError
+    from retry import backoff_delay, retry_call
+    from tracing import install_connect_timing, pop_connect_time
+    from resolver import DNSCache, install_dns_cache
+    from paths import CACHE_DIR
+
+
+class NetEaseMusicDownloader(NetEaseMusicDownloaderBase):
+    """基于requests的下载器，网络请求在调用线程中同步完成"""
+    # 两次预热的最短间隔秒数，服务器会关闭空闲过久的keep-alive连接，间隔过后重新预热
+    PREWARM_INTERVAL = 30
+    
+    def __init__(self, crypto_backend='auto', session_key=False, key_rotation=600, payload_cache_size=128,
+                 pool_connections=10, pool_maxsize=10, max_retries=0, chunk_size=64 * 1024, resume_retries=3,
+                 segments=1, segment_threshold=8 * 1024 * 1024, url_cache_ttl=600,
+                 search_cache_path=os.path.join(CACHE_DIR, 'search_cache.db'), search_cache_ttl=3600,
+                 search_cache_size=256, search_cache_max_bytes=32 * 1024 * 1024, metadata_cache_size=10000,
+                 library_path=os.path.join(CACHE_DIR, 'library.db'), rate_limiter=None, api_retries=3, backoff_base=0.5,
+                 backoff_max=8.0, connect_timeout=5, read_timeout=15, breaker_threshold=5, breaker_reset=30,
+                 tracer=None, dns_cache_ttl=300):
+        super().__init__(crypto_backend, session_key, key_rotation, payload_cache_size, chunk_size=chunk_size,
+                         resume_retries=resume_retries, url_cache_ttl=url_cache_ttl,
+                         search_cache_path=search_cache_path, search_cache_ttl=search_cache_ttl,
+                         search_cache_size=search_cache_size, search_cache_max_bytes=search_cache_max_bytes,
+                         metadata_cache_size=metadata_cache_size, library_path=library_path,
+                         rate_limiter=rate_limiter, api_retries=api_retries, backoff_base=backoff_base,
+                         backoff_max=backoff_max, connect_timeout=connect_timeout, read_timeout=read_timeout,
+                         breaker_threshold=breaker_threshold, breaker_reset=breaker_reset, tracer=tracer)
+        # 分段并行下载: 文件超过 segment_threshold 字节且服务器支持Range时分成 segments 段
+        self.segments = segments
+        self.segment_threshold = segment_threshold
+        # 进程内DNS缓存，缓存 dns_cache_ttl 秒 (0 表示每次新建连接都查询DNS)
+        self.dns_cache = DNSCache(ttl=dns_cache_ttl) if dns_cache_ttl else None
+        self._prewarmed_at = None
+        self._prewarm_lock = threading.Lock()
+        self.session = self._create_session(pool_connections, pool_maxsize, max_retries)
+    
+    def _create_session(self, pool_connections, pool_maxsize, max_retries):
+        """创建带连接池的keep-alive会话
+
+        pool_connections: 缓存的主机连接池数量
+        pool_maxsize: 每个主机保持的最大连接数
+        max_retries: 连接层在连接失败及5xx时的重试次数 (仅幂等请求)。默认不重试，
+                     weapi请求和下载由上层按指数退避重试，避免两层重试叠加拖慢失败判定
+        """
+        session = requests.Session()
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=0.3,
+            status_forcelist=(500, 502, 503, 504)
+        ) if max_retries else 0
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+        install_connect_timing(adapter)
+        if self.dns_cache:
+            install_dns_cache(adapter, self.dns_cache)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers['Connection'] = 'keep-alive'
+        return session
+    
+    def connection_stats(self):
+        """连接复用统计: 每个主机新建的连接数与发出的请求数"""
+        stats = {}
+        for adapter in {id(a): a for a in self.session.adapters.values()}.values():
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                if pool is None:
+                    continue
+                host = f"{pool.scheme}://{pool.host}:{pool.port}"
+                stats[host] = {
+                    'connections': pool.num_connections,
+                    'requests': pool.num_requests,
+                    'reused': pool.num_requests - pool.num_connections
+                }
+        return stats
     
-    def set_cookies(self, cookies):
-        """设置Cookies"""
-        self.cookies = cookies
-        self.headers['cookie'] = cookies
-        print(self.headers)
+    def close(self):
+        """关闭会话并释放连接池"""
+        self.session.close()
+    
+    def prewarm(self, origins=None, connections=1, wait=False, force=False):
+        """在后台预先解析DNS并建立到各源站的keep-alive连接，之后的请求直接复用连接池中的连接
+
+        每个源站建立 connections 个连接；预热失败不影响之后的请求。
+        距上次预热不足 PREWARM_INTERVAL 秒时跳过 (force=True 除外)。
+        wait=True 时等待预热完成。返回启动的线程列表
+        """
+        with self._prewarm_lock:
+            now = time.monotonic()
+            if not force and self._prewarmed_at is not None and now - self._prewarmed_at < self.PREWARM_INTERVAL:
+                return []
+            self._prewarmed_at = now
+        threads = [threading.Thread(target=self._prewarm_origin, args=(origin,), name=f'prewarm-{origin}', daemon=True)
+                   for origin in origins or self.prewarm_origins() for _ in range(connections)]
+        for thread in threads:
+            thread.start()
+        if wait:
+            for thread in threads:
+                thread.join()
+        return threads
+    
+    def _prewarm_origin(self, origin):
+        """解析源站主机名并发出一次HEAD请求，连接随响应放回连接池"""
+        with self.tracer.span('prewarm', origin=origin):
+            try:
+                if self.dns_cache:
+                    self.dns_cache.resolve(urlsplit(origin).hostname)
+                self.session.head(origin + '/', headers={'user-agent': self.headers['user-agent']},
+                                  timeout=self.timeout, allow_redirects=False)
+            except (requests.RequestException, OSError):
+                pass
+    
+    def _post_weapi(self, url, i0x):
+        """加密参数并请求weapi接口，返回解析后的JSON
+
+        weapi接口均为只读查询，可以安全重试: 超时、连接失败、5xx和限流响应按指数退避重试 api_retries 次，
+        仍失败时抛出 TransientError / Throttled；所属端点熔断时直接抛出 CircuitOpen
+        """
+        data = self._encrypt(i0x)
+        return retry_call(lambda: self._post_weapi_once(url, data), self.api_retries,
+                          self.backoff_base, self.backoff_max, self._breaker(url))
+    
+    def _post_weapi_once(self, url, data):
+        """经过限流器发出一次weapi请求"""
+        with self.rate_limiter.slot() as slot:
+            pop_connect_time()
+            try:
+                response = self.session.post(url=url, headers=self.headers, data=data, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                raise TransientError(f"网络错误: {str(e)}") from e
+            connect = pop_connect_time()
+            if connect:
+                self.tracer.record('connect', connect[0], connect[1], endpoint=self.ENDPOINTS.get(url, 'api'))
+            if response.status_code >= 500 and response.status_code not in THROTTLE_STATUS:
+                raise TransientError(f"服务器错误: HTTP {response.status_code}")
+            json_data = None if response.status_code in THROTTLE_STATUS else self._response_json(response)
+            slot.throttled = self._is_throttled(response.status_code, json_data)
+        if slot.throttled:
+            raise Throttled("请求过于频繁，请稍后重试")
+        return json_data
+    
+    def _response_json(self, response):
+        """解析响应JSON"""
+        try:
+            return response.json()
+        except ValueError as e:
+            raise ApiError(f"接口返回了无效的数据: HTTP {response.status_code}") from e
     
     def get_music_info(self, playlist_url=None):
-        """获取音乐信息"""
+        """获取音乐信息，返回 [(歌曲ID, 歌曲名称)]"""
+        try:
+            return [(song['id'], song['name']) for song in self.get_playlist(playlist_url)]
+        except NetEaseError:
+            raise
+        except Exception as e:
+            raise ApiError(f"获取音乐信息失败: {str(e)}") from e
+    
+    def get_playlist(self, playlist=None, with_details=True):
+        """通过歌单详情接口获取歌单/榜单的全部歌曲
+
+        playlist 可以是歌单ID或带 id= 参数的歌单/榜单链接，默认热歌榜。
+        接口一次返回全部 track ID 及前 n 首歌曲的详情，其余歌曲先查元数据缓存，
+        再按ID分批请求歌曲详情；with_details=False 时不请求，缺少详情的歌曲只包含 'id'
+        """
         if not self.cookies:
-            raise Exception("请先设置Cookies")
+            raise AuthError("请先设置Cookies")
         
-        if playlist_url:
-            url = playlist_url
-        else:
-            # 默认热歌榜
-            url = 'http://music.163.com/discover/toplist?id=3778678'
+        playlist_id = self._parse_playlist_id(playlist)
+        try:
+            json_data = self._post_weapi(self.PLAYLIST_API, self._playlist_params(playlist_id))
+            songs = self._parse_playlist(json_data)
+        except NetEaseError:
+            raise
+        except Exception as e:
+            raise ApiError(f"获取歌单失败: {str(e)}") from e
+        
+        missing = [song['id'] for song in songs if 'name' not in song]
+        if missing:
+            if with_details:
+                details = self.get_song_details(missing)
+            else:
+                details, _ = self._cached_song_details(missing)
+            for song in songs:
+                song.update(details.get(song['id'], {}))
+        return songs
+    
+    def get_song_details(self, music_ids, chunk_size=500):
+        """分批获取歌曲详情，返回 {歌曲ID: 歌曲信息}，已缓存的歌曲不再请求"""
+        if not self.cookies:
+            raise AuthError("请先设置Cookies")
         
+        details, missing = self._cached_song_details(music_ids)
         try:
-            html = requests.get(url=url, headers=self.headers).text
-            # 提取歌曲ID / 歌曲名称
-            music_info = re.findall(r'<a href="/song\?id=(\d+)">(.*?)</a>', html)
-            return music_info
+            for start in range(0, len(missing), chunk_size):
+                chunk = missing[start:start + chunk_size]
+                json_data = self._post_weapi(self.SONG_DETAIL_API, self._song_detail_params(chunk))
+                details.update(self._parse_song_details(json_data, chunk))
+            return details
+        except NetEaseError:
+            raise
         except Exception as e:
-            raise Exception(f"获取音乐信息失败: {str(e)}")
+            raise ApiError(f"获取歌曲详情失败: {str(e)}") from e
     
     def get_music_url(self, music_id):
         """获取歌曲下载链接"""
+        info = self.get_music_urls([music_id])[music_id]
+        return info['url'] if info else None
+    
+    def get_music_urls(self, music_ids, chunk_size=100, level='exhigh', refresh=False):
+        """批量获取歌曲下载链接
+
+        按 chunk_size 分批请求接口，返回 {歌曲ID: {'url', 'size', 'md5', 'br', 'expi', 'level'}} ，
+        无法下载的歌曲对应 None。未过期的链接直接取自缓存，refresh=True 时强制重新解析
+        """
         if not self.cookies:
-            raise Exception("请先设置Cookies")
+            raise AuthError("请先设置Cookies")
         
+        result, missing = self._cached_music_urls(music_ids, level, refresh)
         try:
-            # 歌曲接口
-            link = 'https://music.163.com/weapi/song/enhance/player/url/v1'
-            
-            # 构造加密参数
-            i0x = {
-                "ids": f"[{music_id}]",
-                "level": "exhigh", 
-                "encodeType": "aac",
-                "csrf_token": self._extract_csrf_token()
-            }
-            
-            data = self.js_code.call('get_data', i0x)
-            
-            # 发送post请求
-            response = requests.post(url=link, headers=self.headers, data=data)
-            json_data = response.json()
+            for start in range(0, len(missing), chunk_size):
+                chunk = missing[start:start + chunk_size]
+                with self.tracer.span('resolve', songs=[str(mid) for mid in chunk]):
+                    json_data = self._post_weapi(self.SONG_URL_API, self._song_url_params(chunk, level))
+                result.update(self._store_music_urls(self._parse_song_urls(json_data, chunk), level))
             
-            # 提取歌曲下载链接
-            if json_data['data'] and json_data['data'][0]['url']:
-                return json_data['data'][0]['url']
-            else:
-                return None
+            return result
                 
+        except NetEaseError:
+            raise
         except Exception as e:
-            raise Exception(f"获取音乐URL失败: {str(e)}")
+            raise ApiError(f"获取音乐URL失败: {str(e)}") from e
     
-    def search_music(self, keyword):
-        """搜索音乐"""
+    def search_music(self, keyword, offset=0, limit=30, search_type=1):
+        """搜索音乐，结果按 (关键词, 类型, 偏移, 数量) 缓存"""
         if not self.cookies:
-            raise Exception("请先设置Cookies")
+            raise AuthError("请先设置Cookies")
+        
+        cache_key = self._search_cache_key(keyword, search_type, offset, limit)
+        search_info = self.search_cache.get(cache_key)
+        if search_info is not None:
+            return [dict(song) for song in search_info]
         
         try:
-            search_link = 'https://music.163.com/weapi/cloudsearch/get/web'
-            
-            i0x = {
-                "hlpretag": "<span class=\"s-fc7\">",
-                "hlposttag": "</span>",
-                "s": keyword,
-                "type": "1",
-                "offset": "0",
-                "total": "true",
-                "limit": "30",
-                "csrf_token": self._extract_csrf_token()
-            }
-            
-            data = self.js_code.call('get_data', i0x)
-            response = requests.post(url=search_link, headers=self.headers, data=data)
-            json_data = response.json()
-            
-            search_info = []
-            if 'result' in json_data and 'songs' in json_data['result']:
-                for song in json_data['result']['songs']:
-                    artists = '/'.join([artist['name'] for artist in song['ar']])
-                    search_info.append({
-                        'id': song['id'],
-                        'name': song['name'],
-                        'artist': artists,
-                        'album': song['al']['name'],
-                        'duration': self._format_duration(song['dt'] // 1000)
-                    })
-            
-            return search_info
+            json_data = self._post_weapi(self.SEARCH_API, self._search_params(keyword, offset, limit, search_type))
+            return self._store_search_results(cache_key, json_data)
             
+        except NetEaseError:
+            raise
         except Exception as e:
-            raise Exception(f"搜索音乐失败: {str(e)}")
+            raise ApiError(f"搜索音乐失败: {str(e)}") from e
     
-    def show_search_results(self, search_info):
-        """显示搜索结果"""
-        table = PrettyTable()
-        table.field_names = ["序号", "歌曲名称", "歌手", "专辑", "时长"]
-        
-        for index, song in enumerate(search_info):
-            table.add_row([index, song['name'], song['artist'], song['album'], song['duration']])
-        
-        pprint(table)
-        return table
+    def iter_search_pages(self, keyword, page_size=30, max_results=None, search_type=1):
+        """分页搜索生成器，每次迭代才请求 (或从缓存读取) 下一页"""
+        offset = 0
+        while max_results is None or offset < max_results:
+            limit = page_size if max_results is None else min(page_size, max_results - offset)
+            page = self.search_music(keyword, offset, limit, search_type)
+            if page:
+                yield page
+            if len(page) < limit:
+                return
+            offset += limit
+    
+    def download_music(self, music_title, music_url, download_path='music', chunk_size=None,
+                       music_id=None, size=None, md5=None, segments=None, br=None, progress=None, level=None):
+        """下载音乐
 
-    def download_music(self, music_title, music_url, download_path='music'):
-        """下载音乐"""
+        以流式方式分块写入 <文件>.part，并在 .part.json 中记录链接、预期大小和md5。
+        传输中断后再次调用 (包括进程重启后) 会用Range请求从断点续传；
+        链接过期时若提供了 music_id 则按 level 音质 (记录在 .part.json 中) 重新解析。校验通过后原子重命名为目标文件。
+        segments 大于1时，大文件会分成多段并行下载。
+        提供 music_id 时，曲库中已有的歌曲直接跳过，完成后记入曲库。
+        progress(已接收字节数, 总字节数) 在每写入一块后于下载线程中调用
+        """
+        segments = segments or self.segments
+        file_path = None
         try:
-            # 自动创建文件夹
-            if not os.path.exists(download_path):
-                os.makedirs(download_path)
+            record = self._library_record(music_id)
+            if record:
+                return True, record['path']
             
-            # 清理文件名中的非法字符
-            music_title = re.sub(r'[\\/*?:"<>|]', '', music_title)
+            music_title, file_path = self._music_file_path(music_title, download_path, music_id)
+            part_path = file_path + '.part'
+            meta = self._load_part_meta(part_path, music_url, music_id, size, md5, level)
+            meta['br'] = br or meta.get('br')
             
-            # 发送请求下载歌曲
-            response = requests.get(url=music_url)
-            music_data = response.content
-            
-            # 保存歌曲到本地
-            file_path = os.path.join(download_path, music_title + '.mp3')
-            with open(file_path, 'wb') as f:
-                f.write(music_data)
+            cdn = self.breakers['cdn']
+            attempts = 0
+            while True:
+                cdn.allow()
+                try:
+                    if self._use_segments(part_path, meta, segments):
+                        self._fetch_segments(part_path, meta, chunk_size or self.chunk_size, segments, progress)
+                    else:
+                        self._fetch_part(part_path, meta, chunk_size or self.chunk_size, progress)
+                    cdn.record_success()
+                    break
+                except _UrlExpired:
+                    cdn.record_success()
+                    if music_id is None or attempts >= self.resume_retries:
+                        raise DownloadError("下载链接已失效")
+                    url_info = self.get_music_urls([music_id], level=meta['level'], refresh=True)[music_id]
+                    self._refresh_part_url(part_path, meta, url_info)
+                except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError):
+                    # 已写入的部分保留在 .part 中，退避后从断点续传
+                    cdn.record_failure()
+                    if attempts >= self.resume_retries:
+                        raise
+                    time.sleep(backoff_delay(attempts, self.backoff_base, self.backoff_max))
+                except Exception:
+                    # 服务器有响应 (如4xx)，不计入熔断
+                    cdn.record_success()
+                    raise
+                attempts += 1
             
+            self._finish_part(part_path, file_path, meta)
             return True, file_path
             
         except Exception as e:
             return False, f"下载失败: {str(e)}"
+        finally:
+            self._release_path(file_path)
+    
+    def _fetch_part(self, part_path, meta, chunk_size, progress=None):
+        """从 .part 文件当前大小处继续下载"""
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if meta['size'] and offset >= meta['size']:
+            return
+        
+        headers = {'Range': f'bytes={offset}-'} if offset else {}
+        tracer = self.tracer
+        pop_connect_time()
+        request_start = time.perf_counter()
+        with self.session.get(url=meta['url'], headers=headers, stream=True, timeout=self.timeout) as response:
+            if tracer.enabled:
+                self._trace_request(meta['id'], request_start)
+            if response.status_code in (403, 404, 410):
+                raise _UrlExpired()
+            if response.status_code == 416:
+                # 断点超出文件范围，清除后从头下载
+                os.remove(part_path)
+                raise requests.ConnectionError("断点无效，重新下载")
+            if response.status_code >= 500:
+                # CDN暂时故障，按网络错误退避重试
+                raise requests.ConnectionError(f"服务器错误: HTTP {response.status_code}")
+            response.raise_for_status()
+            if response.status_code != 206:
+                # 服务器不支持Range，从头下载
+                offset = 0
+            if not meta['size']:
+                meta['size'] = self._content_total(response.headers, offset)
+                self._save_part_meta(part_path, meta)
+            
+            received = offset
+            if progress:
+                progress(received, meta['size'])
+            transfer_start = time.perf_counter()
+            write_time = 0.0
+            with open(part_path, 'ab' if offset else 'wb') as f:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    if chunk:
+                        if tracer.enabled:
+                            write_start = time.perf_counter()
+                            f.write(chunk)
+                            write_time += time.perf_counter() - write_start
+                        else:
+                            f.write(chunk)
+                        received += len(chunk)
+                        if progress:
+                            progress(received, meta['size'])
+            if tracer.enabled:
+                self._trace_transfer(meta['id'], transfer_start, write_time, received - offset)
+    
+    def _trace_request(self, music_id, request_start):
+        """记录建立连接 (复用连接时没有) 和首字节时间"""
+        headers_received = time.perf_counter()
+        connect = pop_connect_time()
+        if connect:
+            self.tracer.record('connect', connect[0], connect[1], song=music_id)
+        self.tracer.record('ttfb', connect[1] if connect else request_start, headers_received, song=music_id)
+    
+    def _use_segments(self, part_path, meta, segments):
+        """判断是否使用分段下载 (已开始的分段下载总是继续分段)"""
+        if meta.get('segments'):
+            return True
+        if segments <= 1 or (os.path.exists(part_path) and os.path.getsize(part_path)):
+            return False
+        
+        # 探测服务器是否支持Range及文件总大小
+        with self.session.get(url=meta['url'], headers={'Range': 'bytes=0-0'}, stream=True,
+                              timeout=self.timeout) as response:
+            if response.status_code in (403, 404, 410):
+                raise _UrlExpired()
+            if response.status_code != 206 or '/' not in response.headers.get('Content-Range', ''):
+                return False
+            meta['size'] = self._content_total(response.headers, 0) or meta['size']
+        return bool(meta['size']) and meta['size'] >= self.segment_threshold
+    
+    def _fetch_segments(self, part_path, meta, chunk_size, segments, progress=None):
+        """把文件分成多段，用多个连接并行写入预分配的 .part 文件
+
+        每段的已下载字节数记录在 .part.json 中，中断后只补下未完成的部分
+        """
+        size = meta['size']
+        if not meta.get('segments'):
+            step = -(-size // segments)
+            meta['segments'] = [[start, min(start + step, size) - 1, 0] for start in range(0, size, step)]
+            with open(part_path, 'wb') as f:
+                f.truncate(size)
+            self._save_part_meta(part_path, meta)
+        
+        def fetch(segment):
+            start, end, done = segment
+            if start + done > end:
+                return
+            headers = {'Range': f'bytes={start + done}-{end}'}
+            span = self.tracer.span('transfer', song=meta['id'], segment=start)
+            with span, self.session.get(url=meta['url'], headers=headers, stream=True,
+                                        timeout=self.timeout) as response:
+                if response.status_code in (403, 404, 410):
+                    raise _UrlExpired()
+                if response.status_code >= 500:
+                    raise requests.ConnectionError(f"服务器错误: HTTP {response.status_code}")
+                response.raise_for_status()
+                if response.status_code != 206:
+                    raise DownloadError("服务器不支持分段下载")
+                with open(part_path, 'r+b') as f:
+                    f.seek(start + done)
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        if chunk:
+                            f.write(chunk[:end + 1 - start - segment[2]])
+                            segment[2] = min(segment[2] + len(chunk), end + 1 - start)
+                            if progress:
+                                progress(sum(s[2] for s in meta['segments']), size)
+                            if start + segment[2] > end:
+                                break
+        
+        if progress:
+            progress(sum(segment[2] for segment in meta['segments']), size)
+        try:
+            with ThreadPoolExecutor(max_workers=len(meta['segments'])) as executor:
+                futures = [executor.submit(fetch, segment) for segment in meta['segments']]
+                for future in futures:
+                    future.result()
+        finally:
+            self._save_part_meta(part_path, meta)
+        
+        if any(start + done <= end for start, end, done in meta['segments']):
+            raise requests.ConnectionError("分段下载不完整")
+    
+    def sync_playlists(self, playlists, download_path='music', prune=False, max_workers=4,
+                       snapshot_path=os.path.join(CACHE_DIR, 'snapshots.json')):
+        """增量镜像歌单/榜单
+
+        并发获取各歌单的 track ID 列表，与上次保存的快照比较，只补全新增歌曲的详情并下载；
+        下载失败的歌曲不记入快照，下次同步时重试。prune=True 时删除已从所有镜像歌单中移除的本地歌曲。返回同步结果汇总
+        """
+        playlist_ids = [self._parse_playlist_id(playlist) for playlist in playlists]
+        snapshots = self._load_snapshots(snapshot_path)
+        
+        # 并发获取歌单，只取ID不补详情
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(playlist_ids)))) as executor:
+            futures = {pid: executor.submit(self.get_playlist, pid, False) for pid in playlist_ids}
+        
+        summary = {'playlists': {}, 'downloaded': [], 'failed': [], 'pruned': []}
+        added = {}
+        removed = set()
+        current_ids = {}
+        for pid, future in futures.items():
+            try:
+                songs = future.result()
+            except Exception as e:
+                summary['playlists'][pid] = {'error': str(e)}
+                continue
+            previous = set(snapshots.get(pid, {}).get('track_ids', []))
+            current = [song['id'] for song in songs]
+            new_songs = [song for song in songs if song['id'] not in previous]
+            for song in new_songs:
+                added.setdefault(song['id'], song)
+            removed.update(previous - set(current))
+            current_ids[pid] = current
+            summary['playlists'][pid] = {'tracks': len(current), 'added': len(new_songs),
+                                         'removed': len(previous - set(current))}
+        
+        # 只为需要下载的新增歌曲补全详情和解析链接
+        downloaded = self.find_downloaded(list(added))
+        pending = [mid for mid in added if mid not in downloaded]
+        if pending:
+            details = self.get_song_details([mid for mid in pending if 'name' not in added[mid]])
+            for mid, detail in details.items():
+                added[mid].update(detail)
+            music_urls = self.get_music_urls(pending)
+            self._run_sync_downloads(
+                [(dict(added[mid], name=added[mid].get('name') or str(mid)), music_urls.get(mid)) for mid in pending],
+                download_path, max_workers, summary
+            )
+        
+        # 下载失败或没有链接的歌曲不记入快照，下次同步时仍视为新增并重试
+        failed_ids = {item['id'] for item in summary['failed']}
+        for pid, current in current_ids.items():
+            snapshots[pid] = {'track_ids': [mid for mid in current if mid not in failed_ids], 'synced': time.time()}
+        
+        if prune:
+            summary['pruned'] = self._prune_removed(removed, snapshots)
+        self._save_snapshots(snapshot_path, snapshots)
+        return summary
     
-    def _extract_csrf_token(self):
-        """从cookies中提取csrf token"""
-        if self.cookies and '__csrf' in self.cookies:
-            match = re.search(r'__csrf=([^;]+)', self.cookies)
-            if match:
-                return match.group(1)
-        return ''
+    def _run_sync_downloads(self, jobs, download_path, max_workers, summary):
+        """用下载调度器并发下载并等待全部完成"""
+        finished = threading.Event()
+        
+        def on_complete(song, success, message, done, total):
+            summary['downloaded' if success else 'failed'].append({'id': song['id'], 'message': message})
+        
+        scheduler = DownloadScheduler(self, max_workers=max_workers, download_path=download_path)
+        try:
+            scheduler.submit(jobs, on_complete=on_complete, on_finished=lambda batch: finished.set())
+            finished.wait()
+        finally:
+            scheduler.shutdown()
+    
+    def _prune_removed(self, removed, snapshots):
+        """删除不再属于任何镜像歌单的本地歌曲，返回被删除的文件路径"""
+        if self.library is None:
+            return []
+        still_listed = set()
+        for snapshot in snapshots.values():
+            still_listed.update(snapshot['track_ids'])
+        pruned = []
+        for mid in removed - still_listed:
+            record = self.library.get(mid)
+            if record:
+                os.remove(record['path'])
+                pruned.append(record['path'])
+            self.library.remove(mid)
+        return pruned
+    
+    def _load_snapshots(self, snapshot_path):
+        """读取歌单快照 {歌单ID: {'track_ids': [...], 'synced': 时间戳}}"""
+        if not os.path.exists(snapshot_path):
+            return {}
+        with open(snapshot_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
     
-    def _format_duration(self, seconds):
-        """格式化时长"""
-        minutes = seconds // 60
-        seconds = seconds % 60
-        return f"{minutes:02d}:{seconds:02d}"
+    def _save_snapshots(self, snapshot_path, snapshots):
+        """原子写入歌单快照"""
+        directory = os.path.dirname(snapshot_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        tmp_path = snapshot_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshots, f, ensure_ascii=False)
+        os.replace(tmp_path, snapshot_path)
     
     def validate_cookies(self):
         """验证Cookies是否有效"""
         try:
-            test_url = 'http://music.163.com/discover/toplist?id=3778678'
-            response = requests.get(url=test_url, headers=self.headers)
+            response = self.session.get(url=self.TOPLIST_URL, headers=self.headers, timeout=self.timeout)
             return response.status_code == 200
-        except:
+        except requests.RequestException:
             return False
         
 def main():
@@ -185,15 +592,24 @@ def main():
     sample_cookies = input('请输入有效的Cookies: ')
     downloader.set_cookies(sample_cookies)
     if downloader.validate_cookies():
-        choose = input('请输入下载方式 (1. 榜单下载 2. 搜索下载): ')
+        choose = input('请输入下载方式 (1. 榜单下载 2. 搜索下载 3. 歌单同步): ')
         if choose == '1':
             music_info = downloader.get_music_info()
             pprint(music_info)
+            downloaded = downloader.find_downloaded([music_id for music_id, _ in music_info])
+            music_urls = downloader.get_music_urls([music_id for music_id, _ in music_info if music_id not in downloaded])
             for music_id, music_name in music_info:
+                if music_id in downloaded:
+                    print(f'已存在，跳过: {music_name}')
+                    continue
                 print(f'正在下载歌曲: {music_name}')
-                music_url = downloader.get_music_url(music_id)
-                pprint(music_url)
-                downloader.download_music(music_name, music_url)
+                url_info = music_urls[music_id]
+                if not url_info:
+                    print('无法下载该歌曲，可能是因为版权问题。')
+                    continue
+                pprint(url_info['url'])
+                downloader.download_music(music_name, url_info['url'], music_id=music_id,
+                                          size=url_info['size'], md5=url_info['md5'], br=url_info['br'])
         elif choose == '2':
             music_info = downloader.search_music(input('请输入搜索关键词: '))  
             downloader.show_search_results(music_info)
@@ -206,9 +622,15 @@ def main():
                 if not music_url:
                     print('无法下载该歌曲，可能是因为版权问题。')
                     continue
-                downloader.download_music(music_name, music_url)
+                downloader.download_music(music_name, music_url, music_id=music_id)
                 if input('是否继续下载？(y/n): ') != 'y':
                     break       
+        elif choose == '3':
+            playlists = input('请输入歌单/榜单ID或链接 (空格分隔): ').split()
+            prune = input('是否删除已移出歌单的歌曲？(y/n): ') == 'y'
+            summary = downloader.sync_playlists(playlists, prune=prune)
+            pprint(summary['playlists'])
+            print(f"新增下载 {len(summary['downloaded'])} 首，失败 {len(summary['failed'])} 首，删除 {len(summary['pruned'])} 首")
     else:
         print("Cookies无效，请检查后重试。")
 if __name__ == '__main__':
@@ -0,0 +1,34 @@
+# errors.py
+"""下载器抛出的异常类型"""
+
+
+class NetEaseError(Exception):
+    """下载器错误的基类"""
+
+
+class AuthError(NetEaseError):
+    """未设置Cookies或Cookies无效"""
+
+
+class ApiError(NetEaseError):
+    """接口返回了错误码或无法解析的响应"""
+
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+class TransientError(NetEaseError):
+    """超时、连接失败、服务端5xx等可以重试的错误"""
+
+
+class Throttled(TransientError):
+    """接口返回限流响应"""
+
+
+class CircuitOpen(NetEaseError):
+    """端点熔断中，请求被直接拒绝"""
+
+
+class DownloadError(NetEaseError):
+    """下载或校验文件失败"""
@@ -0,0 +1,149 @@
+# library.py
+"""本地曲库索引 (SQLite)
+
+记录已下载歌曲的ID、路径、大小、码率和md5，批量下载前据此跳过已有歌曲
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+AUDIO_EXTENSIONS = ('.mp3', '.flac', '.m4a')
+# 同名冲突时文件名后缀中的歌曲ID，如 "晴天 [id=186016].mp3"；不用 "(数字)"，以免与 "Symphony (1808)" 这样的标题混淆
+ID_SUFFIX = re.compile(r' \[id=(\d+)\]$')
+
+
+def with_id_suffix(title, music_id):
+    """在标题后加上歌曲ID后缀，rebuild 时据此恢复歌曲ID"""
+    return f"{title} [id={music_id}]"
+
+
+def file_md5(path):
+    """计算文件md5"""
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class LibraryIndex:
+    """以歌曲ID为键的本地曲库索引"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS tracks ('
+            'id TEXT PRIMARY KEY, path TEXT NOT NULL, size INTEGER, br INTEGER, md5 TEXT, added REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS tracks_path ON tracks (path)')
+        self._conn.commit()
+
+    def add(self, music_id, path, size=None, br=None, md5=None):
+        """记录一首已下载的歌曲"""
+        path = os.path.abspath(path)
+        if size is None and os.path.exists(path):
+            size = os.path.getsize(path)
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO tracks (id, path, size, br, md5, added) VALUES (?, ?, ?, ?, ?, ?)',
+                (str(music_id), path, size, br, md5, time.time())
+            )
+            self._conn.commit()
+
+    def remove(self, music_id):
+        """删除记录"""
+        with self._lock:
+            self._conn.execute('DELETE FROM tracks WHERE id = ?', (str(music_id),))
+            self._conn.commit()
+
+    def get(self, music_id):
+        """返回歌曲记录；文件已被删除或大小不符时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT id, path, size, br, md5 FROM tracks WHERE id = ?', (str(music_id),)
+            ).fetchone()
+        if row is None:
+            return None
+        record = dict(zip(('id', 'path', 'size', 'br', 'md5'), row))
+        if not os.path.exists(record['path']) or (record['size'] and os.path.getsize(record['path']) != record['size']):
+            return None
+        return record
+
+    def owner(self, path):
+        """返回占用该文件路径的歌曲ID"""
+        with self._lock:
+            row = self._conn.execute('SELECT id FROM tracks WHERE path = ?', (os.path.abspath(path),)).fetchone()
+        return row[0] if row else None
+
+    def find(self, music_ids):
+        """批量查询，返回 {歌曲ID: 记录}，只包含本地文件仍然有效的歌曲"""
+        found = {}
+        for mid in music_ids:
+            record = self.get(mid)
+            if record:
+                found[mid] = record
+        return found
+
+    def rebuild(self, directory, songs=None):
+        """扫描目录重建索引
+
+        歌曲ID依次从以下来源恢复: 文件名中的 " [id=ID]" 后缀、旧索引中md5相同的记录、
+        songs 参数 ([{'id', 'name'}]) 中标题相同的歌曲。文件已不存在的旧记录会被删除。
+        返回重建后的记录数
+        """
+        with self._lock:
+            old_rows = self._conn.execute('SELECT id, path, size, br, md5 FROM tracks').fetchall()
+        by_md5 = {row[4]: row for row in old_rows if row[4]}
+        by_title = {}
+        for song in songs or []:
+            by_title[re.sub(r'[\\/*?:"<>|]', '', song['name'])] = str(song['id'])
+
+        records = {}
+        for name in sorted(os.listdir(directory)):
+            stem, ext = os.path.splitext(name)
+            if ext.lower() not in AUDIO_EXTENSIONS:
+                continue
+            path = os.path.abspath(os.path.join(directory, name))
+            md5 = file_md5(path)
+            br = None
+            match = ID_SUFFIX.search(stem)
+            if match:
+                music_id = match.group(1)
+            elif md5 in by_md5:
+                music_id, br = by_md5[md5][0], by_md5[md5][3]
+            elif stem in by_title:
+                music_id = by_title[stem]
+            else:
+                continue
+            records[music_id] = (music_id, path, os.path.getsize(path), br, md5, time.time())
+
+        # 保留仍然有效、但不在扫描目录中的旧记录
+        for row in old_rows:
+            if row[0] not in records and os.path.exists(row[1]) and os.path.dirname(row[1]) != os.path.abspath(directory):
+                records[row[0]] = tuple(row) + (time.time(),)
+
+        with self._lock:
+            self._conn.execute('DELETE FROM tracks')
+            self._conn.executemany(
+                'INSERT INTO tracks (id, path, size, br, md5, added) VALUES (?, ?, ?, ?, ?, ?)',
+                list(records.values())
+            )
+            self._conn.commit()
+        return len(records)
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM tracks').fetchone()[0]
@@ -0,0 +1,20 @@
+# paths.py
+"""程序目录与缓存目录
+
+缓存文件默认放在程序目录下的 cache 中，而不是当前工作目录，从哪里启动都使用同一份缓存。
+打包后的程序目录为exe所在目录 (源码位于其下的 _internal 中)。
+环境变量 NETEASE_CACHE_DIR 可指定其他缓存目录 (如测试脚本使用临时目录)，需在导入下载模块前设置。
+"""
+import os
+import sys
+
+
+def app_dir():
+    """程序目录: 打包后为exe所在目录，否则为源码目录"""
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(os.path.abspath(sys.executable))
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+APP_DIR = app_dir()
+CACHE_DIR = os.environ.get('NETEASE_CACHE_DIR') or os.path.join(APP_DIR, 'cache')
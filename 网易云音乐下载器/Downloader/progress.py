@@ -0,0 +1,104 @@
+# progress.py
+"""字节级下载进度、吞吐量与剩余时间统计"""
+import threading
+import time
+from collections import deque
+
+
+def format_bytes(size):
+    """把字节数格式化为 KB/MB/GB"""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def format_eta(seconds):
+    """把剩余秒数格式化为 分:秒 或 时:分:秒"""
+    if seconds is None:
+        return '--:--'
+    seconds = int(seconds)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+class TransferMonitor:
+    """汇总一批下载任务的字节进度
+
+    下载线程调用 update 上报每个任务已写入的字节数；on_update(snapshot) 最多每 interval 秒调用一次
+    (任务结束时立即调用)，吞吐量按最近 window 秒内新传输的字节计算，续传前已有的字节不计入吞吐量。
+    snapshot: {'jobs': {任务ID: (已接收, 总大小, 状态)}, 'received', 'total', 'rate', 'eta', 'done', 'count'}
+    状态为 'pending' / 'downloading' / 'done' / 'failed'
+    """
+
+    def __init__(self, on_update=None, interval=0.25, window=5.0):
+        self.on_update = on_update
+        self.interval = interval
+        self.window = window
+        self._jobs = {}
+        self._transferred = 0
+        self._samples = deque()
+        self._last_emit = 0
+        self._lock = threading.Lock()
+
+    def start(self, job_id, total=None):
+        """登记一个任务及其预期大小"""
+        with self._lock:
+            self._jobs[job_id] = [0, total or 0, 'pending']
+
+    def update(self, job_id, received, total=None):
+        """上报任务已接收的字节数 (在下载线程中调用)"""
+        now = time.monotonic()
+        with self._lock:
+            job = self._jobs.setdefault(job_id, [0, 0, 'pending'])
+            if job[2] == 'downloading':
+                self._transferred += max(0, received - job[0])
+            job[0], job[1], job[2] = received, total or job[1], 'downloading'
+            self._samples.append((now, self._transferred))
+            while self._samples and now - self._samples[0][0] > self.window:
+                self._samples.popleft()
+            if now - self._last_emit < self.interval:
+                return
+            self._last_emit = now
+            snapshot = self._snapshot(now)
+        if self.on_update:
+            self.on_update(snapshot)
+
+    def finish(self, job_id, success=True):
+        """标记任务结束并立即通知"""
+        with self._lock:
+            job = self._jobs.setdefault(job_id, [0, 0, 'pending'])
+            if success:
+                job[0] = job[1] = max(job[0], job[1])
+            job[2] = 'done' if success else 'failed'
+            self._last_emit = time.monotonic()
+            snapshot = self._snapshot(self._last_emit)
+        if self.on_update:
+            self.on_update(snapshot)
+
+    def snapshot(self):
+        """返回当前进度"""
+        with self._lock:
+            return self._snapshot(time.monotonic())
+
+    def _snapshot(self, now):
+        received = sum(job[0] for job in self._jobs.values())
+        total = sum(max(job[0], job[1]) for job in self._jobs.values())
+        rate = 0.0
+        if self._samples:
+            start_time, start_bytes = self._samples[0]
+            elapsed = now - start_time
+            if elapsed > 0:
+                rate = (self._transferred - start_bytes) / elapsed
+        finished = sum(1 for job in self._jobs.values() if job[2] in ('done', 'failed'))
+        eta = (total - received) / rate if rate > 0 else None
+        return {
+            'jobs': {job_id: tuple(job) for job_id, job in self._jobs.items()},
+            'received': received,
+            'total': total,
+            'rate': rate,
+            'eta': eta,
+            'done': finished,
+            'count': len(self._jobs),
+        }
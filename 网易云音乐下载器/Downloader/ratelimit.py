@@ -0,0 +1,128 @@
+# ratelimit.py
+"""weapi请求的自适应限流
+
+令牌桶限制请求速率，并发上限按 AIMD (加性增、乘性减) 调整：
+请求成功且延迟正常时缓慢提高速率和并发，遇到限流响应或延迟过高时减半，
+批量任务因此稳定在服务端能容忍的最高吞吐量附近。
+"""
+import asyncio
+import threading
+import time
+
+# 表示请求过于频繁的HTTP状态码和weapi返回码 (405: 操作频繁, -460/-462: 请求异常/需要验证)
+THROTTLE_STATUS = (429, 503)
+THROTTLE_CODES = (405, -460, -462)
+
+
+class AdaptiveRateLimiter:
+    """令牌桶 + AIMD 并发控制，线程和协程均可使用
+
+    rate / max_rate / min_rate: 每秒请求数的初始值和上下限
+    concurrency / max_concurrency / min_concurrency: 同时进行的请求数的初始值和上下限
+    latency_target: 超过该延迟 (秒) 的请求视为拥塞
+    decrease: 拥塞时速率和并发的缩小倍数；cooldown 秒内只缩小一次，避免同一批请求重复惩罚
+    """
+
+    def __init__(self, rate=10.0, max_rate=50.0, min_rate=0.5, concurrency=4, max_concurrency=16,
+                 min_concurrency=1, latency_target=3.0, decrease=0.5, cooldown=1.0):
+        self.rate = float(rate)
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.limit = float(concurrency)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.latency_target = latency_target
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.active = 0
+        self.throttled = 0
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._last_decrease = 0
+        self._lock = threading.Condition()
+
+    def _try_acquire(self):
+        """尝试占用一个并发名额和一个令牌，成功返回 0，否则返回建议等待的秒数"""
+        now = time.monotonic()
+        self._tokens = min(max(self.rate, 1.0), self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self.active >= int(self.limit):
+            return 0.05
+        if self._tokens < 1:
+            return (1 - self._tokens) / self.rate
+        self._tokens -= 1
+        self.active += 1
+        return 0
+
+    def acquire(self):
+        """阻塞直到可以发出请求"""
+        with self._lock:
+            while True:
+                wait = self._try_acquire()
+                if not wait:
+                    return
+                self._lock.wait(wait)
+
+    async def acquire_async(self):
+        """协程版 acquire"""
+        while True:
+            with self._lock:
+                wait = self._try_acquire()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def release(self, latency=None, throttled=False):
+        """请求结束，按结果调整速率和并发；latency 为 None 时 (如连接错误) 不做调整"""
+        with self._lock:
+            self.active -= 1
+            if throttled or (latency is not None and latency > self.latency_target):
+                now = time.monotonic()
+                if throttled:
+                    self.throttled += 1
+                    self._tokens = 0
+                if now - self._last_decrease >= self.cooldown:
+                    self._last_decrease = now
+                    self.limit = max(self.min_concurrency, self.limit * self.decrease)
+                    self.rate = max(self.min_rate, self.rate * self.decrease)
+            elif latency is not None:
+                # 每个"窗口"(约 limit 个成功请求) 并发加一，速率每秒约增加一次请求
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+                self.rate = min(self.max_rate, self.rate + 1 / self.rate)
+            self._lock.notify_all()
+
+    def slot(self):
+        """占用一个请求名额的上下文管理器，支持 with 和 async with"""
+        return _Slot(self)
+
+    def stats(self):
+        """当前速率、并发上限与限流次数"""
+        with self._lock:
+            return {'rate': self.rate, 'concurrency': int(self.limit), 'active': self.active,
+                    'throttled': self.throttled}
+
+
+class _Slot:
+    """一次请求的名额；退出前设置 throttled 表示收到了限流响应"""
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.throttled = False
+        self._start = None
+
+    def __enter__(self):
+        self.limiter.acquire()
+        self._start = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        latency = None if exc_type else time.monotonic() - self._start
+        self.limiter.release(latency, self.throttled)
+
+    async def __aenter__(self):
+        await self.limiter.acquire_async()
+        self._start = time.monotonic()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.__exit__(exc_type, exc, tb)
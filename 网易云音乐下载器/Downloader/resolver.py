@@ -0,0 +1,75 @@
+# resolver.py
+"""进程内DNS缓存
+
+主机名的解析结果按 TTL 缓存，requests 会话的所有连接共用 (见 install_dns_cache)，
+预热连接时解析过的主机，之后新建连接不再查询DNS。连接某个地址失败时从缓存中去掉该地址，
+下次 (如重试时) 改用其余地址，全部失败后重新解析。
+"""
+import socket
+
+try:
+    from Downloader.cache import TTLCache
+except ImportError:
+    from cache import TTLCache
+
+
+class DNSCache:
+    """线程安全的DNS缓存，ttl 为缓存秒数"""
+
+    def __init__(self, ttl=300, maxsize=256):
+        self.ttl = ttl
+        self._cache = TTLCache(default_ttl=ttl, maxsize=maxsize)
+
+    def resolve(self, host, port=None):
+        """返回主机的地址列表 (按 getaddrinfo 的顺序去重)，解析失败时抛出 OSError"""
+        addresses = self._cache.get(host)
+        if addresses is None:
+            addresses = []
+            for info in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM):
+                if info[4][0] not in addresses:
+                    addresses.append(info[4][0])
+            self._cache.set(host, addresses)
+        return addresses
+
+    def invalidate(self, host, address=None):
+        """丢弃主机缓存中的一个地址，address 为 None 或已无其余地址时丢弃整个条目"""
+        addresses = self._cache.pop(host)
+        if address is not None and addresses:
+            addresses = [item for item in addresses if item != address]
+            if addresses:
+                self._cache.set(host, addresses)
+
+    def stats(self):
+        return self._cache.stats()
+
+
+class _CachedDNSMixin:
+    dns_cache = None
+
+    def _new_conn(self):
+        # urllib3 用 _dns_host 建立TCP连接，host 属性也读取它，因此只在建立TCP连接期间替换为缓存的地址，
+        # 之后恢复，Host 头、TLS的SNI和证书校验仍使用原主机名
+        host = self._dns_host
+        try:
+            address = self.dns_cache.resolve(host, self.port)[0]
+        except (OSError, IndexError):
+            return super()._new_conn()
+        self._dns_host = address
+        try:
+            return super()._new_conn()
+        except Exception:
+            self.dns_cache.invalidate(host, address)
+            raise
+        finally:
+            self._dns_host = host
+
+
+def install_dns_cache(adapter, dns_cache):
+    """让 requests 适配器新建连接时使用 dns_cache 解析主机名"""
+    manager = adapter.poolmanager
+    pools = {}
+    for scheme, pool_cls in manager.pool_classes_by_scheme.items():
+        connection_cls = type('CachedDNS' + pool_cls.ConnectionCls.__name__,
+                              (_CachedDNSMixin, pool_cls.ConnectionCls), {'dns_cache': dns_cache})
+        pools[scheme] = type('CachedDNS' + pool_cls.__name__, (pool_cls,), {'ConnectionCls': connection_cls})
+    manager.pool_classes_by_scheme = pools
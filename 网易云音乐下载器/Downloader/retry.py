@@ -0,0 +1,105 @@
+# retry.py
+"""带抖动的指数退避重试与按端点的熔断器"""
+import asyncio
+import random
+import threading
+import time
+
+try:
+    from Downloader.errors import CircuitOpen, Throttled, TransientError
+except ImportError:
+    from errors import CircuitOpen, Throttled, TransientError
+
+
+def backoff_delay(attempt, base=0.5, cap=8.0):
+    """第 attempt 次重试前的等待秒数 (full jitter: 在 [0, min(cap, base*2^attempt)] 中随机)"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """端点熔断器
+
+    连续 failure_threshold 次可重试错误后熔断，reset_timeout 秒内的请求直接抛出 CircuitOpen；
+    之后放行一个试探请求，成功则恢复，失败则重新计时
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """请求前调用，熔断中抛出 CircuitOpen"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and time.monotonic() - self._opened >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return
+            raise CircuitOpen(f"{self.name} 服务暂时不可用，请稍后重试")
+
+    def record_success(self):
+        """请求得到了服务端响应"""
+        with self._lock:
+            self.failures = 0
+            self.state = self.CLOSED
+
+    def record_failure(self):
+        """请求因超时或连接失败等原因失败"""
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened = time.monotonic()
+
+    def record(self, error=None):
+        """按异常类型记录结果: 可重试错误 (限流除外) 计为失败，其余视为服务端正常响应"""
+        if isinstance(error, TransientError) and not isinstance(error, Throttled):
+            self.record_failure()
+        else:
+            self.record_success()
+
+
+def retry_call(func, retries=3, base=0.5, cap=8.0, breaker=None):
+    """调用 func()，遇到 TransientError 时按指数退避重试，最多重试 retries 次"""
+    for attempt in range(retries + 1):
+        if breaker:
+            breaker.allow()
+        try:
+            result = func()
+        except Exception as e:
+            if breaker:
+                breaker.record(e)
+            if not isinstance(e, TransientError) or attempt >= retries:
+                raise
+            time.sleep(backoff_delay(attempt, base, cap))
+            continue
+        if breaker:
+            breaker.record_success()
+        return result
+
+
+async def retry_call_async(func, retries=3, base=0.5, cap=8.0, breaker=None):
+    """协程版 retry_call，func 返回协程"""
+    for attempt in range(retries + 1):
+        if breaker:
+            breaker.allow()
+        try:
+            result = await func()
+        except Exception as e:
+            if breaker:
+                breaker.record(e)
+            if not isinstance(e, TransientError) or attempt >= retries:
+                raise
+            await asyncio.sleep(backoff_delay(attempt, base, cap))
+            continue
+        if breaker:
+            breaker.record_success()
+        return result
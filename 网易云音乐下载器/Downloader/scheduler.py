@@ -0,0 +1,94 @@
+# scheduler.py
+"""有界并发下载调度器"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DownloadBatch:
+    """一批下载任务的完成进度"""
+
+    def __init__(self, total, on_complete=None, on_finished=None, monitor=None):
+        self.total = total
+        self.monitor = monitor
+        self.done = 0
+        self.succeeded = 0
+        self.on_complete = on_complete
+        self.on_finished = on_finished
+        self._lock = threading.Lock()
+
+    def job_done(self, song, success, message):
+        """记录单个任务完成，并触发回调"""
+        with self._lock:
+            self.done += 1
+            if success:
+                self.succeeded += 1
+            done = self.done
+        if self.monitor:
+            self.monitor.finish(song.get('id'), success)
+        if self.on_complete:
+            self.on_complete(song, success, message, done, self.total)
+        if done == self.total and self.on_finished:
+            self.on_finished(self)
+
+
+class DownloadScheduler:
+    """固定大小线程池下载调度器
+
+    下载吞吐只受带宽和 max_workers 限制；回调在下载线程中执行
+    """
+
+    def __init__(self, downloader, max_workers=4, download_path='music'):
+        self.downloader = downloader
+        self.max_workers = max_workers
+        self.download_path = download_path
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='download')
+
+    def submit(self, jobs, on_complete=None, on_finished=None, downloaded=None, monitor=None):
+        """提交一批下载任务
+
+        jobs: [(song, url_info), ...]，song 至少包含 'id' 和 'name'，
+              url_info 为 get_music_urls 的结果项，None 表示无法下载
+        on_complete(song, success, message, done, total): 每个任务完成时调用
+        on_finished(batch): 全部任务完成后调用
+        downloaded: find_downloaded 的结果，其中的歌曲直接按成功处理
+        monitor: TransferMonitor，按歌曲ID汇总字节进度
+        """
+        jobs = list(jobs)
+        downloaded = downloaded or {}
+        batch = DownloadBatch(len(jobs), on_complete, on_finished, monitor)
+        if monitor:
+            for song, url_info in jobs:
+                monitor.start(song.get('id'), (url_info or {}).get('size'))
+        if not jobs:
+            if on_finished:
+                on_finished(batch)
+            return batch
+
+        for song, url_info in jobs:
+            if song.get('id') in downloaded:
+                batch.job_done(song, True, downloaded[song['id']]['path'])
+            elif url_info:
+                self._executor.submit(self._run, batch, song, url_info)
+            else:
+                batch.job_done(song, False, "无法获取下载链接")
+        return batch
+
+    def _run(self, batch, song, url_info):
+        """在工作线程中下载单首歌曲"""
+        progress = None
+        if batch.monitor:
+            progress = lambda received, total: batch.monitor.update(song.get('id'), received, total)
+        try:
+            with self.downloader.tracer.span('download', song=str(song.get('id'))):
+                success, message = self.downloader.download_music(
+                    song['name'], url_info['url'], self.download_path,
+                    music_id=song.get('id'), size=url_info.get('size'), md5=url_info.get('md5'),
+                    br=url_info.get('br'), progress=progress, level=url_info.get('level')
+                )
+        except Exception as e:
+            success, message = False, str(e)
+        batch.job_done(song, success, message)
+
+    def shutdown(self, wait=False):
+        """停止调度器，取消尚未开始的任务"""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,226 @@
+# tracing.py
+"""分阶段耗时记录
+
+下载器在各阶段记录 span: encrypt (weapi加密)、resolve (解析链接)、connect (建立连接)、
+ttfb (发出请求到收到响应头)、transfer (接收文件内容，属性 write 为其中累计的写盘秒数)、
+download (单首歌曲全程)、prewarm (预热连接)。
+span 交给可插拔的 sink: HistogramSink (内存中的分位数汇总)、JsonLinesSink、ChromeTraceSink
+(chrome://tracing / Perfetto 可打开)。未启用时使用 NULL_TRACER，每次调用只是一次空方法调用。
+
+环境变量 NETEASE_TRACE_CHROME / NETEASE_TRACE_JSONL 指定输出文件，NETEASE_TRACE_SUMMARY=1 启用汇总。
+"""
+import json
+import os
+import threading
+import time
+
+# 当前线程最近一次建立连接的 (开始, 结束) 时间，由 install_connect_timing 安装的连接类写入
+_connect_times = threading.local()
+
+
+class Tracer:
+    """把 span 分发给各 sink"""
+    enabled = True
+
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+        # perf_counter 与墙上时间的对应关系，用于导出绝对时间
+        self.origin = (time.time(), time.perf_counter())
+
+    def span(self, name, **attrs):
+        """记录代码块耗时的上下文管理器"""
+        return _Span(self, name, attrs)
+
+    def record(self, name, start, end, **attrs):
+        """记录一个已测得的 span，start/end 为 time.perf_counter() 的值"""
+        span = {'name': name, 'start': start, 'end': end, 'thread': threading.get_ident(), 'attrs': attrs}
+        for sink in self.sinks:
+            sink.add(self, span)
+
+    def summary(self):
+        """各 HistogramSink 的汇总文本"""
+        return '\n'.join(sink.format() for sink in self.sinks if isinstance(sink, HistogramSink))
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'attrs', 'start')
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type:
+            self.attrs['error'] = exc_type.__name__
+        self.tracer.record(self.name, self.start, time.perf_counter(), **self.attrs)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+class _NullTracer:
+    """未启用时的空实现"""
+    enabled = False
+    sinks = ()
+
+    def span(self, name, **attrs):
+        return _NULL_SPAN
+
+    def record(self, name, start, end, **attrs):
+        pass
+
+    def summary(self):
+        return ''
+
+    def close(self):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+NULL_TRACER = _NullTracer()
+
+
+class HistogramSink:
+    """按阶段汇总次数、总耗时和分位数"""
+
+    def __init__(self):
+        self.durations = {}
+        self._lock = threading.Lock()
+
+    def add(self, tracer, span):
+        with self._lock:
+            self.durations.setdefault(span['name'], []).append(span['end'] - span['start'])
+
+    def summary(self):
+        """返回 {阶段: {'count', 'total', 'mean', 'p50', 'p90', 'p99', 'max'}} (秒)"""
+        with self._lock:
+            items = {name: sorted(values) for name, values in self.durations.items()}
+        result = {}
+        for name, values in items.items():
+            def quantile(q):
+                return values[min(len(values) - 1, int(q * len(values)))]
+            result[name] = {'count': len(values), 'total': sum(values), 'mean': sum(values) / len(values),
+                            'p50': quantile(0.5), 'p90': quantile(0.9), 'p99': quantile(0.99), 'max': values[-1]}
+        return result
+
+    def format(self):
+        """汇总表格文本 (毫秒)"""
+        # 中文标题占两列宽，对齐时少补两个空格
+        lines = [f"{'阶段':10}{'次数':>6}{'总计(ms)':>10}{'平均':>8}{'p50':>10}{'p90':>10}{'p99':>10}{'最大':>8}"]
+        for name, stats in sorted(self.summary().items(), key=lambda item: -item[1]['total']):
+            lines.append(f"{name:12}{stats['count']:>8}" + ''.join(
+                f"{stats[key] * 1000:>12.1f}" if key == 'total' else f"{stats[key] * 1000:>10.1f}"
+                for key in ('total', 'mean', 'p50', 'p90', 'p99', 'max')
+            ))
+        return '\n'.join(lines)
+
+    def close(self):
+        pass
+
+
+class JsonLinesSink:
+    """每个 span 写一行JSON: name, ts (Unix时间), dur (秒), thread 及附加属性"""
+
+    def __init__(self, path):
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def add(self, tracer, span):
+        wall, perf = tracer.origin
+        line = json.dumps(dict(span['attrs'], name=span['name'], ts=round(wall + span['start'] - perf, 6),
+                               dur=round(span['end'] - span['start'], 6), thread=span['thread']),
+                          ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class ChromeTraceSink:
+    """Chrome trace event 格式，close 时写出文件"""
+
+    def __init__(self, path):
+        self.path = path
+        self.events = []
+        self._lock = threading.Lock()
+
+    def add(self, tracer, span):
+        event = {'name': span['name'], 'cat': 'download', 'ph': 'X', 'pid': os.getpid(), 'tid': span['thread'],
+                 'ts': round((span['start'] - tracer.origin[1]) * 1e6, 1),
+                 'dur': round((span['end'] - span['start']) * 1e6, 1), 'args': span['attrs']}
+        with self._lock:
+            self.events.append(event)
+
+    def close(self):
+        with self._lock:
+            events = list(self.events)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+
+
+def create_tracer(summary=False, jsonl_path=None, chrome_path=None):
+    """按需创建带汇总、JSON-lines 和 Chrome trace 输出的 Tracer，都未启用时返回 NULL_TRACER"""
+    sinks = []
+    if summary:
+        sinks.append(HistogramSink())
+    if jsonl_path:
+        sinks.append(JsonLinesSink(jsonl_path))
+    if chrome_path:
+        sinks.append(ChromeTraceSink(chrome_path))
+    return Tracer(sinks) if sinks else NULL_TRACER
+
+
+def tracer_from_env():
+    """按环境变量创建 Tracer，未配置时返回 NULL_TRACER"""
+    return create_tracer(bool(os.environ.get('NETEASE_TRACE_SUMMARY')), os.environ.get('NETEASE_TRACE_JSONL'),
+                         os.environ.get('NETEASE_TRACE_CHROME'))
+
+
+def pop_connect_time():
+    """取出当前线程最近一次建立连接的 (开始, 结束)，复用连接时返回 None"""
+    times = getattr(_connect_times, 'last', None)
+    _connect_times.last = None
+    return times
+
+
+class _TimedConnectMixin:
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _connect_times.last = (start, time.perf_counter())
+
+
+_timed_pools = {}
+
+
+def install_connect_timing(adapter):
+    """让 requests 适配器的连接池记录建立连接 (含TLS握手) 的耗时，见 pop_connect_time"""
+    manager = adapter.poolmanager
+    pools = {}
+    for scheme, pool_cls in manager.pool_classes_by_scheme.items():
+        if pool_cls not in _timed_pools:
+            connection_cls = type('Timed' + pool_cls.ConnectionCls.__name__,
+                                  (_TimedConnectMixin, pool_cls.ConnectionCls), {})
+            _timed_pools[pool_cls] = type('Timed' + pool_cls.__name__, (pool_cls,), {'ConnectionCls': connection_cls})
+        pools[scheme] = _timed_pools[pool_cls]
+    manager.pool_classes_by_scheme = pools
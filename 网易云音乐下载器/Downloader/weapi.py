@@ -0,0 +1,142 @@
+# weapi.py
+"""网易云音乐 weapi 参数加密
+
+wangyi.js 中 asrsea 的纯Python实现：
+    params    = AES-CBC(AES-CBC(明文, 预置密钥), 随机密钥)
+    encSecKey = RSA(倒序的随机密钥)  (无填充)
+execjs 仅作为缺少加密库时的备用方案。
+"""
+import base64
+import json
+import os
+import secrets
+import string
+import threading
+import time
+
+try:
+    from Crypto.Cipher import AES
+    from Crypto.Util.Padding import pad
+except ImportError:
+    AES = None
+
+# wangyi.js get_data 中写死的参数
+PRESET_KEY = '0CoJUm6Qyw8W8jud'
+IV = '0102030405060708'
+PUBKEY = '010001'
+MODULUS = ('00e0b509f6259df8642dbc35662901477df22677ec152b5ff68ace615bb7b725152b3ab17a876aea8a5aa76d2e'
+           '417629ec4ee341f56135fccf695280104e0312ecbda92557c93870114af6c9d05c4f7f0c3685b7a46bee255932'
+           '575cce10b424d813cfe4875d3e82047b97ddef52741d546b8e289dc6935b3ece0462db0a22b8e7')
+
+SECRET_CHARS = string.ascii_letters + string.digits
+JS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'wangyi.js')
+
+
+def create_secret_key(size=16):
+    """生成随机密钥 (对应JS中的a(16))"""
+    return ''.join(secrets.choice(SECRET_CHARS) for _ in range(size))
+
+
+def aes_encrypt(text, key):
+    """AES-CBC加密并返回base64字符串 (对应JS中的b)"""
+    cipher = AES.new(key.encode('utf-8'), AES.MODE_CBC, IV.encode('utf-8'))
+    encrypted = cipher.encrypt(pad(text.encode('utf-8'), AES.block_size))
+    return base64.b64encode(encrypted).decode('utf-8')
+
+
+def rsa_encrypt(text, pubkey=PUBKEY, modulus=MODULUS):
+    """RSA加密 (对应JS中的c, 明文倒序、无填充)"""
+    reversed_text = text[::-1].encode('utf-8')
+    result = pow(int(reversed_text.hex(), 16), int(pubkey, 16), int(modulus, 16))
+    return format(result, 'x').zfill(256)
+
+
+def dumps(i0x):
+    """与JS的JSON.stringify保持一致的序列化"""
+    return json.dumps(i0x, ensure_ascii=False, separators=(',', ':'))
+
+
+class PythonCrypto:
+    """纯Python加密后端
+
+    session_key=True 时随机密钥及其encSecKey在会话内只生成一次，
+    每隔 key_rotation 秒轮换 (0 或 None 表示不轮换)，从而省去每次请求的RSA运算。
+    """
+    name = 'python'
+
+    def __init__(self, session_key=False, key_rotation=600):
+        self.session_key = session_key
+        self.key_rotation = key_rotation
+        self._session = None
+        self._session_created = 0
+        self._lock = threading.Lock()
+
+    def _new_secret(self):
+        """生成随机密钥及对应的encSecKey"""
+        secret_key = create_secret_key()
+        return secret_key, rsa_encrypt(secret_key)
+
+    def _get_secret(self):
+        """获取本次请求使用的随机密钥"""
+        if not self.session_key:
+            return self._new_secret()
+        with self._lock:
+            now = time.monotonic()
+            expired = self.key_rotation and now - self._session_created >= self.key_rotation
+            if self._session is None or expired:
+                self._session = self._new_secret()
+                self._session_created = now
+            return self._session
+
+    def rotate(self):
+        """立即轮换会话密钥"""
+        with self._lock:
+            self._session = None
+
+    def encrypt(self, i0x):
+        """加密请求参数，返回 {'params': ..., 'encSecKey': ...}"""
+        secret_key, enc_sec_key = self._get_secret()
+        params = aes_encrypt(aes_encrypt(dumps(i0x), PRESET_KEY), secret_key)
+        return {
+            'params': params,
+            'encSecKey': enc_sec_key
+        }
+
+
+class ExecJSCrypto:
+    """execjs备用加密后端 (调用wangyi.js)"""
+    name = 'execjs'
+
+    def __init__(self, js_path=JS_PATH):
+        self.js_code = self._load_js_code(js_path)
+
+    def _load_js_code(self, js_path):
+        """加载并编译JS加密代码"""
+        try:
+            import execjs
+            with open(js_path, 'r', encoding='utf-8') as f:
+                return execjs.compile(f.read())
+        except FileNotFoundError:
+            raise Exception("网易.js文件未找到，请确保加密文件存在")
+        except Exception as e:
+            raise Exception(f"加载JS加密代码失败: {str(e)}")
+
+    def encrypt(self, i0x):
+        """加密请求参数，返回 {'params': ..., 'encSecKey': ...}"""
+        return self.js_code.call('get_data', i0x)
+
+
+def create_crypto(backend='auto', session_key=False, key_rotation=600):
+    """创建加密后端
+
+    backend: 'auto' 优先使用纯Python实现, 缺少加密库时回退到execjs;
+             'python' / 'execjs' 强制指定后端
+    session_key / key_rotation: 会话密钥模式，仅Python后端支持
+    """
+    if backend == 'python' or (backend == 'auto' and AES is not None):
+        if AES is None:
+            raise Exception("未安装pycryptodome，无法使用Python加密后端")
+        return PythonCrypto(session_key=session_key, key_rotation=key_rotation)
+    if backend in ('auto', 'execjs'):
+        return ExecJSCrypto()
+    raise ValueError(f"未知的加密后端: {backend}")
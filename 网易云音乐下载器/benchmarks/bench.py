@@ -0,0 +1,263 @@
+# bench.py
+"""下载器基准测试
+
+针对本地模拟服务 (mock_server.py) 测量:
+    encrypt  每次weapi加密的耗时 (新随机密钥 / 会话密钥 / 加密缓存命中 / execjs)
+    resolve  批量解析歌曲链接的速率 (首/秒)
+    e2e      200首歌曲的批量任务从解析到下载完成的速率 (首/秒, MB/秒)
+    startup  主窗口首次绘制的耗时 (毫秒，见 startup.py)
+每项在独立子进程中运行并记录峰值内存 (peak_rss_kb)。结果追加到 results.jsonl，
+并与上一次相同配置的结果比较，变差超过 --tolerance 的指标标记为回归。
+
+    python benchmarks/bench.py
+    python benchmarks/bench.py --only e2e --latency 0.05 --bandwidth 1048576 --check
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+BENCHMARKS = ('encrypt', 'resolve', 'e2e', 'startup')
+RESULTS_PATH = os.path.join(BENCH_DIR, 'results.jsonl')
+# 数值越大越好的指标后缀，其余指标越小越好
+HIGHER_IS_BETTER = ('_per_sec',)
+
+
+def peak_rss_kb():
+    """当前进程的峰值内存 (KB)，不支持的平台返回 None"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def create_downloader(mock, workdir, jobs=8):
+    """创建指向模拟服务的下载器"""
+    from Downloader.downloader import NetEaseMusicDownloader
+    downloader = NetEaseMusicDownloader(session_key=True, key_rotation=0, pool_maxsize=max(10, jobs),
+                                        search_cache_path=None, library_path=os.path.join(workdir, 'library.db'))
+    downloader.set_cookies('MUSIC_U=bench; __csrf=bench')
+    mock.configure(downloader)
+    return downloader
+
+
+def bench_encrypt(config):
+    from Downloader.weapi import PythonCrypto, ExecJSCrypto
+    from Downloader.downloader import NetEaseMusicDownloader
+    n = config['encrypt_iterations']
+    payload = {'ids': '[' + ','.join(str(i) for i in range(100)) + ']', 'level': 'exhigh',
+               'encodeType': 'aac', 'csrf_token': ''}
+
+    def per_call(func, iterations):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func(payload)
+        return (time.perf_counter() - started) / iterations * 1e6
+
+    results = {
+        'encrypt_fresh_us': per_call(PythonCrypto().encrypt, n),
+        'encrypt_session_us': per_call(PythonCrypto(session_key=True, key_rotation=0).encrypt, n),
+    }
+    downloader = NetEaseMusicDownloader(session_key=True, search_cache_path=None, library_path=None)
+    results['encrypt_cached_us'] = per_call(downloader._encrypt, n)
+    try:
+        results['encrypt_execjs_us'] = per_call(ExecJSCrypto().encrypt, max(1, n // 50))
+    except Exception:
+        pass
+    return results
+
+
+def bench_resolve(config):
+    from mock_server import MockNetEase
+    mock = MockNetEase(latency=config['latency'], error_rate=config['error_rate'],
+                       throttle_rate=config['throttle_rate']).start()
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            downloader = create_downloader(mock, workdir)
+            ids = list(range(1, config['resolve_tracks'] + 1))
+            started = time.perf_counter()
+            urls = downloader.get_music_urls(ids)
+            elapsed = time.perf_counter() - started
+            downloader.close()
+            downloader.library.close()
+    finally:
+        mock.stop()
+    return {
+        'resolve_ids_per_sec': len(ids) / elapsed,
+        'resolve_elapsed': elapsed,
+        'resolved': sum(1 for info in urls.values() if info),
+        'requests': mock.stats.get('v1', 0),
+    }
+
+
+def bench_e2e(config):
+    from mock_server import MockNetEase
+    from Downloader.cli import BatchRunner
+    from Downloader.scheduler import DownloadScheduler
+    mock = MockNetEase(latency=config['latency'], bandwidth=config['bandwidth'], error_rate=config['error_rate'],
+                       throttle_rate=config['throttle_rate'], drop_rate=config['drop_rate'],
+                       track_size=config['track_size']).start()
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            downloader = create_downloader(mock, workdir, config['jobs'])
+            scheduler = DownloadScheduler(downloader, max_workers=config['jobs'],
+                                          download_path=os.path.join(workdir, 'music'))
+            runner = BatchRunner(downloader, scheduler, io.StringIO())
+            songs = [{'id': mid} for mid in range(1, config['e2e_tracks'] + 1)]
+            started = time.perf_counter()
+            for start in range(0, len(songs), config['batch_size']):
+                runner.run_batch(songs[start:start + config['batch_size']])
+            elapsed = time.perf_counter() - started
+            scheduler.shutdown(wait=True)
+            downloader.close()
+            downloader.library.close()
+    finally:
+        mock.stop()
+    downloaded = runner.summary['downloaded']
+    return {
+        'e2e_songs_per_sec': downloaded / elapsed,
+        'e2e_mb_per_sec': downloaded * len(mock.body) / elapsed / 1024 / 1024,
+        'e2e_elapsed': elapsed,
+        'downloaded': downloaded,
+        'failed': runner.summary['failed'],
+    }
+
+
+def bench_startup(config):
+    from startup import measure
+    metrics = measure()
+    metrics['eager_modules'] = ','.join(metrics['eager_modules']) or None
+    return metrics
+
+
+def run_worker(name, config):
+    """子进程入口: 运行一项基准测试并输出JSON"""
+    metrics = globals()[f'bench_{name}'](config)
+    # startup 的峰值内存取自被测的窗口进程
+    metrics.setdefault('peak_rss_kb', peak_rss_kb())
+    print(json.dumps(metrics))
+
+
+def run_isolated(name, config):
+    """在独立子进程中运行一项基准测试，使峰值内存只反映该项"""
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--worker', name, '--config', json.dumps(config)],
+        check=True, stdout=subprocess.PIPE, universal_newlines=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR, stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, universal_newlines=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def load_previous(path, config):
+    """返回结果文件中最近一次相同配置的记录"""
+    if not os.path.exists(path):
+        return None
+    previous = None
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get('config') == config:
+                previous = record
+    return previous
+
+
+def compare(results, previous, tolerance):
+    """打印与上一次结果的对比，返回回归的指标列表"""
+    regressions = []
+    for name, metrics in results.items():
+        old_metrics = (previous or {}).get('results', {}).get(name, {})
+        for key, value in metrics.items():
+            line = f'  {name:8} {key:22} {value:>14.3f}' if isinstance(value, float) else \
+                f'  {name:8} {key:22} {str(value):>14}'
+            old = old_metrics.get(key)
+            if isinstance(value, (int, float)) and isinstance(old, (int, float)) and old and key != 'requests':
+                change = (value - old) / old
+                worse = -change if key.endswith(HIGHER_IS_BETTER) else change
+                line += f'  {change:+8.1%}'
+                if key.endswith(('_us', '_ms', '_per_sec', 'peak_rss_kb')) and worse > tolerance:
+                    line += '  回归'
+                    regressions.append(f'{name}.{key}')
+            print(line)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='下载器基准测试')
+    parser.add_argument('--only', action='append', choices=BENCHMARKS, help='只运行指定项，可重复')
+    parser.add_argument('--latency', type=float, default=0.02, help='模拟服务每个请求的延迟 (秒)')
+    parser.add_argument('--bandwidth', type=int, default=4 * 1024 * 1024, help='CDN每连接限速 (字节/秒)，0 表示不限速')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='HTTP 503 的概率')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='weapi返回限流码的概率')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='CDN传输中途断开的概率')
+    parser.add_argument('--track-size', type=int, default=512 * 1024, help='每首歌曲的字节数')
+    parser.add_argument('--jobs', type=int, default=8, help='并发下载数')
+    parser.add_argument('--encrypt-iterations', type=int, default=2000)
+    parser.add_argument('--resolve-tracks', type=int, default=2000)
+    parser.add_argument('--e2e-tracks', type=int, default=200)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--results', default=RESULTS_PATH, help='结果文件 (JSON-lines)')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='判定回归的变差比例 (默认 0.1)')
+    parser.add_argument('--check', action='store_true', help='有回归时以退出码 1 结束')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--config', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        run_worker(args.worker, json.loads(args.config))
+        return 0
+
+    config = {
+        'latency': args.latency, 'bandwidth': args.bandwidth or None, 'error_rate': args.error_rate,
+        'throttle_rate': args.throttle_rate, 'drop_rate': args.drop_rate, 'track_size': args.track_size,
+        'jobs': args.jobs, 'encrypt_iterations': args.encrypt_iterations, 'resolve_tracks': args.resolve_tracks,
+        'e2e_tracks': args.e2e_tracks, 'batch_size': args.batch_size,
+    }
+    names = args.only or list(BENCHMARKS)
+    results = {}
+    for name in names:
+        print(f'运行 {name} ...', file=sys.stderr)
+        results[name] = run_isolated(name, config)
+
+    record_config = dict(config, benchmarks=sorted(names))
+    previous = load_previous(args.results, record_config)
+    print(f'对比: {previous["time"]} ({previous.get("commit")})' if previous else '对比: 无历史结果')
+    regressions = compare(results, previous, args.tolerance)
+
+    with open(args.results, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'config': record_config,
+            'results': results,
+        }, ensure_ascii=False) + '\n')
+
+    if regressions:
+        print('回归: ' + ', '.join(regressions))
+    return 1 if regressions and args.check else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
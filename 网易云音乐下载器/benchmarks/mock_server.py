@@ -0,0 +1,250 @@
+# mock_server.py
+"""本地模拟网易云音乐服务，用于基准测试
+
+模拟榜单页面、搜索、歌单详情、歌曲详情、歌曲链接接口和CDN文件下载，
+可配置延迟、带宽和错误注入。weapi参数按真实格式加密；encSecKey 无法用公钥解密，
+因此下载器需使用会话密钥模式，并通过 register_key 登记随机密钥，服务端才能读出请求参数。
+
+    python mock_server.py --port 8000 --latency 0.05 --bandwidth 2097152
+"""
+import argparse
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from Crypto.Cipher import AES
+from Crypto.Util.Padding import unpad
+
+PRESET_KEY = b'0CoJUm6Qyw8W8jud'
+IV = b'0102030405060708'
+
+
+def aes_decrypt(text, key):
+    cipher = AES.new(key, AES.MODE_CBC, IV)
+    return unpad(cipher.decrypt(base64.b64decode(text)), AES.block_size).decode('utf-8')
+
+
+class MockNetEase:
+    """模拟服务
+
+    latency: 每个请求的附加延迟 (秒)
+    bandwidth: CDN每个连接的限速 (字节/秒)，None 表示不限速
+    error_rate: 返回HTTP 503的概率; throttle_rate: weapi返回限流码 405 的概率;
+    drop_rate: CDN传输中途断开连接的概率
+    track_size: 每首歌曲文件的字节数; catalog_size: 曲库中的歌曲数 (ID为 1..catalog_size)
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, bandwidth=None, error_rate=0.0, throttle_rate=0.0,
+                 drop_rate=0.0, track_size=512 * 1024, catalog_size=10000, seed=None):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.drop_rate = drop_rate
+        self.catalog_size = catalog_size
+        self.body = bytes(range(256)) * (track_size // 256) + bytes(track_size % 256)
+        self.md5 = hashlib.md5(self.body).hexdigest()
+        self.keys = {}
+        self.stats = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def register_key(self, secret_key, enc_sec_key):
+        """登记会话密钥，之后可以解密使用该密钥的请求"""
+        self.keys[enc_sec_key] = secret_key
+
+    def configure(self, downloader):
+        """把下载器的接口地址指向本服务，并登记其会话密钥"""
+        downloader.TOPLIST_URL = self.url + '/discover/toplist?id=3778678'
+        downloader.PLAYLIST_API = self.url + '/weapi/v6/playlist/detail'
+        downloader.SONG_DETAIL_API = self.url + '/weapi/v3/song/detail'
+        downloader.SONG_URL_API = self.url + '/weapi/song/enhance/player/url/v1'
+        downloader.SEARCH_API = self.url + '/weapi/cloudsearch/get/web'
+        self.register_key(*downloader.crypto._get_secret())
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] = self.stats.get(name, 0) + 1
+
+    def _chance(self, rate):
+        with self._lock:
+            return rate > 0 and self._random.random() < rate
+
+    def _song(self, mid):
+        return {'id': mid, 'name': f'Track {mid}', 'ar': [{'name': f'Artist {mid % 97}'}],
+                'al': {'name': f'Album {mid % 31}'}, 'dt': 180000 + mid % 120000}
+
+    def weapi(self, path, params):
+        """按接口路径生成响应"""
+        if path.endswith('/cloudsearch/get/web'):
+            offset, limit = int(params.get('offset', 0)), int(params.get('limit', 30))
+            ids = range(offset + 1, min(offset + limit, self.catalog_size) + 1)
+            return {'code': 200, 'result': {'songs': [self._song(mid) for mid in ids], 'songCount': self.catalog_size}}
+        if path.endswith('/song/enhance/player/url/v1'):
+            ids = json.loads(params.get('ids', '[]'))
+            return {'code': 200, 'data': [
+                {'id': mid, 'url': f'{self.url}/cdn/{mid}.mp3', 'size': len(self.body), 'md5': self.md5,
+                 'br': 320000, 'expi': 1200} for mid in ids
+            ]}
+        if path.endswith('/song/detail'):
+            ids = json.loads(params.get('ids', '[]'))
+            return {'code': 200, 'songs': [self._song(int(mid)) for mid in ids]}
+        if path.endswith('/playlist/detail'):
+            n = min(int(params.get('n', 1000)), self.catalog_size)
+            return {'code': 200, 'playlist': {
+                'id': params.get('id'),
+                'trackIds': [{'id': mid} for mid in range(1, self.catalog_size + 1)],
+                'tracks': [self._song(mid) for mid in range(1, n + 1)]
+            }}
+        return {'code': 404, 'message': 'unknown api'}
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def send(self, status, body=b'', content_type='application/json', headers=None):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def delay(self):
+                if mock.latency:
+                    time.sleep(mock.latency)
+                if mock._chance(mock.error_rate):
+                    mock._count('errors')
+                    self.send(503)
+                    return False
+                return True
+
+            def do_GET(self):
+                if not self.delay():
+                    return
+                if self.path.startswith('/discover/toplist'):
+                    mock._count('toplist')
+                    self.send(200, b'<html><body><ul class="f-hide"></ul></body></html>', 'text/html')
+                elif self.path.startswith('/cdn/'):
+                    mock._count('cdn')
+                    self.send_file()
+                else:
+                    self.send(404)
+
+            def do_HEAD(self):
+                # 客户端预热连接用，只返回响应头
+                mock._count('head')
+                self.send_response(200)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                form = parse_qs(self.rfile.read(length).decode('utf-8'))
+                if not self.delay():
+                    return
+                name = self.path.rsplit('/', 1)[-1]
+                mock._count(name)
+                if mock._chance(mock.throttle_rate):
+                    mock._count('throttled')
+                    self.send(200, json.dumps({'code': 405, 'message': '操作频繁'}).encode('utf-8'))
+                    return
+                secret_key = mock.keys.get(form.get('encSecKey', [''])[0])
+                if secret_key is None:
+                    self.send(200, json.dumps({'code': 301, 'message': 'unknown key'}).encode('utf-8'))
+                    return
+                text = aes_decrypt(aes_decrypt(form['params'][0], secret_key.encode('utf-8')).encode('utf-8'),
+                                   PRESET_KEY)
+                body = json.dumps(mock.weapi(self.path, json.loads(text)), ensure_ascii=False).encode('utf-8')
+                self.send(200, body)
+
+            def send_file(self):
+                body = mock.body
+                start = 0
+                match = re.match(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+                if match:
+                    start = int(match.group(1))
+                    end = int(match.group(2)) if match.group(2) else len(body) - 1
+                    if start >= len(body):
+                        self.send(416)
+                        return
+                    data = body[start:end + 1]
+                    self.send_response(206)
+                    self.send_header('Content-Range', f'bytes {start}-{start + len(data) - 1}/{len(body)}')
+                else:
+                    data = body
+                    self.send_response(200)
+                self.send_header('Content-Type', 'audio/mpeg')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+
+                drop_at = len(data) // 2 if mock._chance(mock.drop_rate) else None
+                chunk = 64 * 1024
+                started = time.monotonic()
+                sent = 0
+                while sent < len(data):
+                    if drop_at is not None and sent >= drop_at:
+                        mock._count('dropped')
+                        self.close_connection = True
+                        return
+                    self.wfile.write(data[sent:sent + chunk])
+                    sent += len(data[sent:sent + chunk])
+                    if mock.bandwidth:
+                        ahead = sent / mock.bandwidth - (time.monotonic() - started)
+                        if ahead > 0:
+                            time.sleep(ahead)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟网易云音乐服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--bandwidth', type=int, default=None)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--throttle-rate', type=float, default=0.0)
+    parser.add_argument('--drop-rate', type=float, default=0.0)
+    parser.add_argument('--track-size', type=int, default=512 * 1024)
+    args = parser.parse_args()
+    mock = MockNetEase(args.host, args.port, args.latency, args.bandwidth, args.error_rate, args.throttle_rate,
+                       args.drop_rate, args.track_size).start()
+    print(f'模拟服务已启动: {mock.url}')
+    try:
+        mock._thread.join()
+    except KeyboardInterrupt:
+        mock.stop()
+
+
+if __name__ == '__main__':
+    main()
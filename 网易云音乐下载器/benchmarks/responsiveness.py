@@ -0,0 +1,106 @@
+# responsiveness.py
+"""界面响应性测试
+
+启动主窗口 (默认 offscreen 平台插件)，让工作线程的搜索槽函数阻塞约 --block 秒，
+同时在界面线程用 QTimer 每 10 毫秒计时一次。任务经排队信号在工作线程执行时，
+界面事件循环不应被阻塞：相邻两次计时的最大间隔超过 --max-gap 毫秒时退出码为 1。
+
+    python benchmarks/responsiveness.py
+    python benchmarks/responsiveness.py --block 2 --max-gap 50
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(BENCH_DIR)
+
+# 计时器间隔 (毫秒)
+TICK_INTERVAL = 10
+
+
+def measure(block=1.0, timeout=10.0):
+    """点击搜索后工作线程阻塞 block 秒，返回 (界面计时的最大间隔毫秒, 槽函数是否完成)"""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    sys.path.insert(0, APP_DIR)
+    import main
+    from PyQt5.QtCore import QTimer
+    from PyQt5.QtWidgets import QApplication
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    window = main.MainWindow()
+    window.show()
+
+    deadline = time.monotonic() + timeout
+    while window.worker.downloader is None and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    if window.worker.downloader is None:
+        raise RuntimeError('下载器初始化超时')
+
+    def slow_search_pages(keyword, page_size):
+        # 模拟慢速网络: 取第一页时阻塞工作线程
+        time.sleep(block)
+        # 返回一首歌曲，空结果会弹出模态对话框
+        yield [{'id': 1, 'name': 'Track 1', 'artist': 'Artist', 'album': 'Album', 'duration': '03:00'}]
+
+    window.worker.downloader.iter_search_pages = slow_search_pages
+    ticks = []
+    finished = []
+    timer = QTimer()
+    timer.setInterval(TICK_INTERVAL)
+    timer.timeout.connect(lambda: ticks.append(time.perf_counter()))
+    window.worker.search_results_ready.connect(lambda songs, has_more: finished.append(time.perf_counter()))
+
+    def run_events(seconds):
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            app.processEvents()
+            time.sleep(0.001)
+
+    # 点击前后各计时一小段，界面线程被阻塞时才会出现大的间隔
+    timer.start()
+    run_events(0.2)
+    window.ui.lineEdit_3.setText('responsiveness')
+    window.on_get_search_results()
+    deadline = time.monotonic() + block + timeout
+    while not finished and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.001)
+    # 覆盖结果回到界面线程的处理
+    run_events(0.2)
+    timer.stop()
+
+    window.worker.stop()
+    window.worker_thread.quit()
+    window.worker_thread.wait()
+
+    gaps = [(b - a) * 1000 for a, b in zip(ticks, ticks[1:])]
+    return max(gaps) if gaps else float('inf'), bool(finished)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='界面响应性测试')
+    parser.add_argument('--block', type=float, default=1.0, help='工作线程阻塞的秒数 (默认 1)')
+    parser.add_argument('--max-gap', type=float, default=100.0, help='允许的最大计时间隔，毫秒 (默认 100)')
+    args = parser.parse_args(argv)
+
+    # 缓存放在临时目录，不读写程序目录下的搜索缓存和曲库 (需在导入下载模块前设置)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        os.environ['NETEASE_CACHE_DIR'] = cache_dir
+        max_gap, finished = measure(args.block)
+
+    print(f'  最大计时间隔 {max_gap:.1f} ms (上限 {args.max_gap:.0f} ms)')
+    if not finished:
+        print('搜索槽函数未完成')
+        return 1
+    if max_gap > args.max_gap:
+        print('界面线程被阻塞')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+# startup.py
+"""启动速度基准测试
+
+在子进程中启动主窗口，测量从启动进程到窗口首次绘制 (time-to-first-paint) 的耗时，
+并检查首次绘制前没有导入网络和加密模块 (它们应在工作线程中按需加载)。
+取多次运行的中位数，超出 --budget 或提前导入了这些模块时退出码为 1。
+默认使用 offscreen 平台插件，无需显示器。
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 10 --budget 0.8
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(BENCH_DIR)
+
+# 首次绘制前不应导入的模块
+DEFERRED_MODULES = ('requests', 'urllib3', 'Crypto', 'execjs', 'prettytable', 'Downloader.downloader')
+# 首次绘制耗时预算 (秒)
+DEFAULT_BUDGET = 1.0
+
+
+def run_worker(launched):
+    """子进程入口: 启动主窗口，首次绘制时输出耗时并退出"""
+    sys.path.insert(0, APP_DIR)
+    started = time.time()
+    import main
+    imported = time.time()
+    from PyQt5.QtWidgets import QApplication
+
+    app = QApplication(sys.argv[:1])
+    window = main.MainWindow()
+    result = {}
+
+    def on_first_paint():
+        # 先于窗口自己的 (排队) 连接执行，此时工作线程尚未启动
+        now = time.time()
+        result.update(
+            first_paint_ms=(now - launched) * 1000,
+            interpreter_ms=(started - launched) * 1000,
+            import_ms=(imported - started) * 1000,
+            window_ms=(now - imported) * 1000,
+            eager_modules=[name for name in DEFERRED_MODULES if name in sys.modules],
+        )
+        app.quit()
+
+    window.first_paint.connect(on_first_paint)
+    window.show()
+    app.exec_()
+    window.worker.stop()
+    window.worker_thread.quit()
+    window.worker_thread.wait()
+    try:
+        import resource
+        result['peak_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:
+        pass
+    print(json.dumps(result))
+
+
+def run_once():
+    """启动一次子进程，返回其测得的结果"""
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    # 缓存放在临时目录，不读写程序目录下的搜索缓存和曲库
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env['NETEASE_CACHE_DIR'] = cache_dir
+        launched = time.time()
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--worker', repr(launched)],
+            check=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True, env=env
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure(runs=5):
+    """多次启动，返回各项耗时的中位数 (毫秒) 及首次绘制前导入的模块"""
+    samples = [run_once() for _ in range(runs)]
+    metrics = {}
+    for key in ('first_paint_ms', 'interpreter_ms', 'import_ms', 'window_ms'):
+        values = sorted(sample[key] for sample in samples)
+        metrics[key] = values[len(values) // 2]
+    metrics['first_paint_min_ms'] = min(sample['first_paint_ms'] for sample in samples)
+    if 'peak_rss_kb' in samples[0]:
+        metrics['peak_rss_kb'] = max(sample['peak_rss_kb'] for sample in samples)
+    metrics['eager_modules'] = sorted({name for sample in samples for name in sample['eager_modules']})
+    return metrics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='启动速度基准测试')
+    parser.add_argument('--runs', type=int, default=5, help='启动次数 (默认 5)')
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET,
+                        help=f'首次绘制耗时预算，秒 (默认 {DEFAULT_BUDGET})')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        run_worker(float(args.worker))
+        return 0
+
+    metrics = measure(args.runs)
+    for key, value in metrics.items():
+        print(f'  {key:20} {value:>10.1f}' if isinstance(value, float) else f'  {key:20} {value}')
+
+    failed = False
+    if metrics['first_paint_ms'] > args.budget * 1000:
+        print(f'超出预算: 首次绘制 {metrics["first_paint_ms"]:.0f} ms > {args.budget * 1000:.0f} ms')
+        failed = True
+    if metrics['eager_modules']:
+        print('首次绘制前导入了: ' + ', '.join(metrics['eager_modules']))
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
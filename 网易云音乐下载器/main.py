@@ -13,7 +13,8 @@ warnings.filterwarnings("ignore", category=DeprecationWarning)
 from PyQt5 import QtCore, QtGui, QtWidgets
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QMessageBox, QHeaderView, 
                              QProgressBar, QLabel, QAbstractItemView)
-from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QObject, QThread, QAbstractTableModel, QVariant
+from PyQt5.QtCore import (Qt, pyqtSignal, pyqtSlot, QObject, QThread, QAbstractTableModel, QModelIndex,
+                          QVariant)
 
 # 获取当前文件的目录
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -27,21 +28,40 @@ except ImportError:
     sys.path.append('.')
     from ui.Ui_main import Ui_wangyiyun
 
+# 网络和加密模块 (requests、pycryptodome、execjs) 在工作线程初始化下载器时才导入，
+# 启动时只加载界面需要的模块
 try:
-    from Downloader.downloader import NetEaseMusicDownloader
+    from Downloader.progress import TransferMonitor, format_bytes, format_eta
+    from Downloader.tracing import tracer_from_env
+    from Downloader.paths import APP_DIR
 except ImportError:
     print("错误: 无法导入downloader模块")
     print("请确保downloader.py文件存在")
     sys.exit(1)
 
 
+# 窗口图标，位于程序目录 (打包后为exe所在目录，源码在其下的 _internal 中) 的 sourse 下
+ICON_PATH = os.path.join(APP_DIR, "sourse", "conan.ico")
+
+
 class SongTableModel(QAbstractTableModel):
-    """歌曲表格模型"""
-    def __init__(self, data, headers, parent=None):
+    """歌曲表格模型
+
+    提供 fetch_more 回调时支持滚动到底部时惰性加载下一页；"进度"列显示下载进度
+    """
+    # 列标题对应的歌曲字段
+    COLUMN_FIELDS = {"歌曲名": ('name', ''), "歌手": ('artist', '未知'), "专辑": ('album', '未知'),
+                     "时长": ('duration', '--:--')}
+    
+    def __init__(self, data, headers, parent=None, fetch_more=None, has_more=False):
         super().__init__(parent)
         self._data = data
         self._headers = headers
         self._check_states = [Qt.Unchecked] * len(data)
+        self._progress = {}
+        self._fetch_more = fetch_more
+        self._has_more = has_more
+        self._fetching = False
     
     def rowCount(self, parent=None):
         return len(self._data)
@@ -61,25 +81,20 @@ class SongTableModel(QAbstractTableModel):
         
         song = self._data[row]
         
+        header = self._headers[col]
         if role == Qt.DisplayRole:
-            if col == 0:
-                return ""
-            elif col == 1:
-                return song.get('name', '')
-            elif col == 2:
-                return song.get('artist', '未知')
-            elif col == 3 and len(self._headers) == 4:
-                return song.get('duration', '--:--')
-            elif col == 3 and len(self._headers) == 5:
-                return song.get('album', '未知')
-            elif col == 4:
-                return song.get('duration', '--:--')
+            if header in self.COLUMN_FIELDS:
+                field, default = self.COLUMN_FIELDS[header]
+                return song.get(field, default)
+            elif header == "进度":
+                return self._progress.get(song.get('id'), '')
+            return ""
         
         elif role == Qt.CheckStateRole and col == 0:
             return self._check_states[row]
         
         elif role == Qt.TextAlignmentRole:
-            if col == 0 or col == (len(self._headers) - 1):  # 选择列和时长列居中
+            if header in ("选择", "时长", "进度"):  # 选择列、时长列和进度列居中
                 return Qt.AlignCenter
             return Qt.AlignLeft | Qt.AlignVCenter
         
@@ -115,6 +130,72 @@ class SongTableModel(QAbstractTableModel):
         
         return Qt.ItemIsEnabled | Qt.ItemIsSelectable
     
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return self._fetch_more is not None and self._has_more and not self._fetching
+    
+    def fetchMore(self, parent=QModelIndex()):
+        """请求下一页，结果通过append_songs追加"""
+        if not self.canFetchMore(parent):
+            return
+        self._fetching = True
+        self._fetch_more()
+    
+    def append_songs(self, songs, has_more):
+        """追加一页歌曲"""
+        self._fetching = False
+        self._has_more = has_more
+        if not songs:
+            return
+        first = len(self._data)
+        self.beginInsertRows(QModelIndex(), first, first + len(songs) - 1)
+        self._data.extend(songs)
+        self._check_states.extend([Qt.Unchecked] * len(songs))
+        self.endInsertRows()
+    
+    def update_songs(self, details):
+        """用歌曲详情原地更新对应行，只对变化的行发出dataChanged"""
+        row_of = {song['id']: row for row, song in enumerate(self._data)}
+        rows = []
+        for detail in details:
+            row = row_of.get(detail['id'])
+            if row is not None:
+                self._data[row].update(detail)
+                rows.append(row)
+        
+        # 相邻的行合并为一次通知
+        rows.sort()
+        start = 0
+        for i in range(1, len(rows) + 1):
+            if i == len(rows) or rows[i] != rows[i - 1] + 1:
+                self.dataChanged.emit(self.index(rows[start], 1), self.index(rows[i - 1], self.columnCount() - 1),
+                                      [Qt.DisplayRole])
+                start = i
+    
+    def update_progress(self, jobs):
+        """按 TransferMonitor 快照中的 {歌曲ID: (已接收, 总大小, 状态)} 更新进度列"""
+        if "进度" not in self._headers:
+            return
+        col = self._headers.index("进度")
+        for row, song in enumerate(self._data):
+            job = jobs.get(song.get('id'))
+            if job is None:
+                continue
+            received, total, state = job
+            if state == 'done':
+                text = "完成"
+            elif state == 'failed':
+                text = "失败"
+            elif state == 'pending':
+                text = "等待中"
+            else:
+                text = f"{received * 100 // total}%" if total else format_bytes(received)
+            if self._progress.get(song['id']) != text:
+                self._progress[song['id']] = text
+                index = self.index(row, col)
+                self.dataChanged.emit(index, index, [Qt.DisplayRole])
+    
     def get_selected_songs(self):
         """获取选中的歌曲"""
         selected = []
@@ -134,31 +215,57 @@ class DownloadWorker(QObject):
     """下载工作线程类"""
     # 定义信号
     status_update = pyqtSignal(str, str)  # 修改：添加table_type参数
-    progress_update = pyqtSignal(int, int)
+    progress_update = pyqtSignal(int, int)  # 已完成任务数, 任务总数
+    transfer_progress = pyqtSignal(str, object)  # 表格类型, TransferMonitor快照
     download_complete = pyqtSignal(str, bool, str)
+    batch_complete = pyqtSignal(str)
     playlist_loaded = pyqtSignal(list)
-    search_results_ready = pyqtSignal(list)
+    songs_enriched = pyqtSignal(list)  # 补全详情的歌曲
+    search_results_ready = pyqtSignal(list, bool)  # 第一页结果, 是否还有下一页
+    search_page_ready = pyqtSignal(str, list, bool)  # 关键词, 后续页结果, 是否还有下一页
     validation_complete = pyqtSignal(bool, str)
     
-    def __init__(self):
+    def __init__(self, max_downloads=4, search_page_size=30, detail_chunk_size=200, tracer=None):
         super().__init__()
+        # 分阶段耗时记录，默认按 NETEASE_TRACE_* 环境变量启用
+        self.tracer = tracer or tracer_from_env()
+        self.detail_chunk_size = detail_chunk_size
         self.downloader = None
+        self.scheduler = None
+        self.max_downloads = max_downloads
+        self.search_page_size = search_page_size
+        self._search_keyword = None
+        self._search_pages = None
         self._running = True
     
+    @pyqtSlot()
     def init_downloader(self):
-        """初始化下载器"""
+        """初始化下载器 (在工作线程中导入下载模块并预热加密后端)"""
         try:
-            self.downloader = NetEaseMusicDownloader()
+            from Downloader.downloader import NetEaseMusicDownloader
+            from Downloader.scheduler import DownloadScheduler
+            self.downloader = NetEaseMusicDownloader(tracer=self.tracer)
+            self.downloader.warm_up()
+            self.downloader.prewarm()
+            self.scheduler = DownloadScheduler(self.downloader, max_workers=self.max_downloads)
             return True
         except Exception as e:
             self.status_update.emit(f"初始化下载器失败: {str(e)}", "playlist")
             return False
     
+    @pyqtSlot(str)
     def set_cookies(self, cookies):
         """设置Cookies"""
         if self.downloader:
             self.downloader.set_cookies(cookies)
     
+    @pyqtSlot()
+    def prewarm(self):
+        """后台预热到接口和CDN的连接 (距上次预热不久时跳过)"""
+        if self.downloader:
+            self.downloader.prewarm()
+    
+    @pyqtSlot()
     def validate_cookies(self):
         """验证Cookies"""
         try:
@@ -173,38 +280,68 @@ class DownloadWorker(QObject):
         except Exception as e:
             self.validation_complete.emit(False, f"验证失败: {str(e)}")
     
+    @pyqtSlot(str)
     def get_playlist_songs(self, playlist_url):
-        """获取榜单歌曲"""
+        """获取榜单歌曲: 先显示列表，再分批补全缺少的歌曲详情"""
         try:
             if self.downloader:
-                music_info = self.downloader.get_music_info(playlist_url)
-                songs = []
-                for mid, name in music_info:
-                    songs.append({
-                        'id': mid,
-                        'name': name,
-                        'artist': '未知',
-                        'duration': '--:--',
-                        'selected': False
-                    })
+                songs = self.downloader.get_playlist(playlist_url, with_details=False)
                 self.playlist_loaded.emit(songs)
+                self.enrich_songs([song['id'] for song in songs if 'name' not in song])
             else:
                 self.status_update.emit("下载器未初始化！", "playlist")
         except Exception as e:
             self.status_update.emit(f"获取榜单失败: {str(e)}", "playlist")
             self.playlist_loaded.emit([])
     
+    def enrich_songs(self, music_ids):
+        """分批获取歌曲详情，每批完成后发出songs_enriched"""
+        for start in range(0, len(music_ids), self.detail_chunk_size):
+            if not self._running:
+                return
+            chunk = music_ids[start:start + self.detail_chunk_size]
+            try:
+                details = self.downloader.get_song_details(chunk)
+            except Exception as e:
+                self.status_update.emit(f"获取歌曲详情失败: {str(e)}", "playlist")
+                return
+            self.songs_enriched.emit(list(details.values()))
+    
+    @pyqtSlot(str)
     def search_songs(self, keyword):
-        """搜索歌曲"""
+        """搜索歌曲 (第一页)"""
         try:
             if self.downloader:
-                search_results = self.downloader.search_music(keyword)
-                self.search_results_ready.emit(search_results)
+                self._search_keyword = keyword
+                self._search_pages = self.downloader.iter_search_pages(keyword, self.search_page_size)
+                songs, has_more = self._next_search_page()
+                self.search_results_ready.emit(songs, has_more)
             else:
                 self.status_update.emit("下载器未初始化！", "search")
         except Exception as e:
             self.status_update.emit(f"搜索失败: {str(e)}", "search")
-            self.search_results_ready.emit([])
+            self.search_results_ready.emit([], False)
+    
+    @pyqtSlot()
+    def fetch_more_search(self):
+        """加载当前搜索的下一页"""
+        keyword = self._search_keyword
+        try:
+            songs, has_more = self._next_search_page()
+        except Exception as e:
+            self.status_update.emit(f"加载更多失败: {str(e)}", "search")
+            songs, has_more = [], False
+        self.search_page_ready.emit(keyword, songs, has_more)
+    
+    def _next_search_page(self):
+        """从分页生成器取下一页，返回 (歌曲列表, 是否可能还有下一页)"""
+        if self._search_pages is None:
+            return [], False
+        songs = next(self._search_pages, [])
+        has_more = len(songs) >= self.search_page_size
+        if not has_more:
+            self._search_pages = None
+        return songs, has_more
     
     def download_single_song(self, song_id, song_name):
         """下载单首歌曲"""
@@ -215,7 +352,7 @@ class DownloadWorker(QObject):
                 
                 if music_url:
                     # 下载歌曲
-                    success, message = self.downloader.download_music(song_name, music_url)
+                    success, message = self.downloader.download_music(song_name, music_url, music_id=song_id)
                     self.download_complete.emit(song_name, success, message)
                 else:
                     self.download_complete.emit(song_name, False, "无法获取下载链接")
@@ -224,12 +361,72 @@ class DownloadWorker(QObject):
         except Exception as e:
             self.download_complete.emit(song_name, False, str(e))
     
+    @pyqtSlot(list, str)
+    def download_songs(self, songs, table_type):
+        """批量下载歌曲: 跳过曲库中已有的歌曲，其余分批解析下载链接后交给调度器并发下载"""
+        if not self.downloader:
+            self._fail_batch(songs, table_type, "下载器未初始化")
+            return
+        
+        try:
+            downloaded = self.downloader.find_downloaded([song['id'] for song in songs])
+            music_urls = self.downloader.get_music_urls([song['id'] for song in songs if song['id'] not in downloaded])
+        except Exception as e:
+            self._fail_batch(songs, table_type, str(e))
+            return
+        
+        # 详情尚未补全的歌曲以ID作为文件名
+        jobs = [(dict(song, name=song.get('name') or str(song['id'])), music_urls.get(song['id'])) for song in songs]
+        
+        # 字节进度限速为每秒数次，经排队信号送到界面线程
+        monitor = TransferMonitor(on_update=lambda snapshot: self.transfer_progress.emit(table_type, snapshot))
+        self.scheduler.submit(
+            jobs,
+            on_complete=self._on_job_complete,
+            on_finished=lambda batch: self._on_batch_finished(table_type),
+            downloaded=downloaded,
+            monitor=monitor
+        )
+    
+    def _on_job_complete(self, song, success, message, done, total):
+        """单个下载任务完成 (在下载线程中调用，信号会排队到界面线程)"""
+        self.download_complete.emit(song['name'], success, message)
+        self.progress_update.emit(done, total)
+    
+    def _on_batch_finished(self, table_type):
+        """整批任务完成，启用耗时汇总时打印各阶段耗时"""
+        summary = self.tracer.summary()
+        if summary:
+            print(summary)
+        self.batch_complete.emit(table_type)
+    
+    def _fail_batch(self, songs, table_type, message):
+        """整批任务失败"""
+        for i, song in enumerate(songs):
+            self.download_complete.emit(song['name'], False, message)
+            self.progress_update.emit(i + 1, len(songs))
+        self.batch_complete.emit(table_type)
+    
     def stop(self):
         """停止工作线程"""
         self._running = False
+        if self.scheduler:
+            self.scheduler.shutdown()
+        self.tracer.close()
 
 
 class MainWindow(QMainWindow):
+    # 窗口首次绘制完成 (之后才启动工作线程)
+    first_paint = pyqtSignal()
+    # 发往工作线程的任务信号 (跨线程排队执行，网络请求不会阻塞界面事件循环)
+    request_set_cookies = pyqtSignal(str)
+    request_prewarm = pyqtSignal()
+    request_validate = pyqtSignal()
+    request_playlist = pyqtSignal(str)
+    request_search = pyqtSignal(str)
+    request_search_more = pyqtSignal()
+    request_download = pyqtSignal(list, str)
+    
     def __init__(self):
         super().__init__()
         
@@ -247,9 +444,12 @@ class MainWindow(QMainWindow):
         self.worker = None
         self.init_worker_thread()
         
+        self._painted = False
+        
         # 初始化数据
         self.playlist_model = None
         self.search_model = None
+        self.search_keyword = None
         self.current_table_type = "playlist"  # 当前表格类型
         
         # 设置UI属性
@@ -262,33 +462,13 @@ class MainWindow(QMainWindow):
         self.init_tables()
     
     def setup_icon(self):
-        """设置窗口图标"""
-        # 尝试多种路径
-        icon_paths = [
-            os.path.join(current_dir, "sourse", "conan.ico"),  # 注意：根据您的目录是sourse不是source
-            os.path.join(current_dir, "source", "conan.ico"),  # 也尝试source
-            os.path.join(current_dir, "conan.ico"),             # 当前目录
-            "sourse/conan.ico",                                # 相对路径
-            "source/conan.ico",                                # 另一种拼写
-            "./sourse/conan.ico",                              # 当前目录的相对路径
-        ]
-        
-        icon = None
-        for path in icon_paths:
-            if os.path.exists(path):
-                try:
-                    icon = QtGui.QIcon(path)
-                    self.setWindowIcon(icon)
-                    print(f"成功加载图标: {path}")
-                    break
-                except Exception as e:
-                    print(f"加载图标失败 {path}: {e}")
-        
-        if icon is None:
+        """设置窗口图标，图标文件不存在时使用系统图标"""
+        icon = QtGui.QIcon(ICON_PATH)
+        # 文件不存在时 QIcon 并非 isNull()，但读不出任何尺寸
+        if not icon.availableSizes():
             print("警告: 未找到图标文件，使用默认图标")
-            # 使用默认图标或系统图标
             icon = self.style().standardIcon(QtWidgets.QStyle.SP_ComputerIcon)
-            self.setWindowIcon(icon)
+        self.setWindowIcon(icon)
     
     def init_worker_thread(self):
         """初始化工作线程"""
@@ -302,16 +482,36 @@ class MainWindow(QMainWindow):
         # 连接工作线程信号 - 修正：status_update现在接收两个参数
         self.worker.status_update.connect(self.update_status)
         self.worker.progress_update.connect(self.update_progress)
+        self.worker.transfer_progress.connect(self.on_transfer_progress)
         self.worker.download_complete.connect(self.on_download_complete)
+        self.worker.batch_complete.connect(self.restore_buttons)
         self.worker.playlist_loaded.connect(self.on_playlist_loaded)
+        self.worker.songs_enriched.connect(self.on_songs_enriched)
         self.worker.search_results_ready.connect(self.on_search_results_ready)
+        self.worker.search_page_ready.connect(self.on_search_page_ready)
         self.worker.validation_complete.connect(self.on_validation_complete)
         
-        # 启动线程
-        self.worker_thread.start()
+        # 连接任务信号，槽函数在工作线程中执行
+        self.request_set_cookies.connect(self.worker.set_cookies)
+        self.request_prewarm.connect(self.worker.prewarm)
+        self.request_validate.connect(self.worker.validate_cookies)
+        self.request_playlist.connect(self.worker.get_playlist_songs)
+        self.request_search.connect(self.worker.search_songs)
+        self.request_search_more.connect(self.worker.fetch_more_search)
+        self.request_download.connect(self.worker.download_songs)
         
-        # 初始化下载器
-        QTimer.singleShot(0, self.worker.init_downloader)
+        # 线程启动后在工作线程中初始化下载器
+        self.worker_thread.started.connect(self.worker.init_downloader)
+        
+        # 窗口首次绘制后再启动线程，导入下载模块不与界面初始化争抢；
+        # 在此之前发出的任务信号会排队，等下载器初始化后依次执行
+        self.first_paint.connect(self.worker_thread.start, Qt.QueuedConnection)
+    
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._painted:
+            self._painted = True
+            self.first_paint.emit()
     
     def setup_ui(self):
         """设置UI属性和样式"""
@@ -336,8 +536,13 @@ class MainWindow(QMainWindow):
         self.progress_bar.setMaximumWidth(200)
         self.progress_bar.hide()
         
+        # 吞吐量/剩余时间
+        self.transfer_label = QLabel()
+        self.transfer_label.hide()
+        
         # 将进度条添加到状态栏
-        # self.ui.statusbar.addPermanentWidget(self.progress_bar)
+        self.statusBar().addPermanentWidget(self.transfer_label)
+        self.statusBar().addPermanentWidget(self.progress_bar)
     
     def setup_button_styles(self):
         """设置按钮样式"""
@@ -394,6 +599,8 @@ class MainWindow(QMainWindow):
         """连接信号和槽"""
         # Cookies测试按钮
         self.ui.pushButton.clicked.connect(self.on_test_cookies)
+        # 输入Cookies时预热连接，之后的首次请求不再等待DNS和握手
+        self.ui.lineEdit.textChanged.connect(self.request_prewarm)
         
         # 榜单下载按钮
         self.ui.pushButton_2.clicked.connect(self.on_get_playlist)
@@ -453,8 +660,8 @@ class MainWindow(QMainWindow):
         self.update_status("正在验证Cookies...", "playlist")
         
         # 设置Cookies并开始验证
-        self.worker.set_cookies(cookies)
-        QTimer.singleShot(0, self.worker.validate_cookies)
+        self.request_set_cookies.emit(cookies)
+        self.request_validate.emit()
     
     def on_validation_complete(self, success, message):
         """验证完成回调"""
@@ -485,7 +692,7 @@ class MainWindow(QMainWindow):
         self.update_status("正在获取榜单歌曲...", "playlist")
         
         # 在线程中获取榜单歌曲
-        QTimer.singleShot(0, lambda: self.worker.get_playlist_songs(playlist_url))
+        self.request_playlist.emit(playlist_url)
     
     def on_playlist_loaded(self, songs):
         """榜单歌曲加载完成"""
@@ -495,7 +702,7 @@ class MainWindow(QMainWindow):
         
         if songs:
             # 创建并设置模型
-            self.playlist_model = SongTableModel(songs, ["选择", "歌曲名", "歌手", "时长"])
+            self.playlist_model = SongTableModel(songs, ["选择", "歌曲名", "歌手", "时长", "进度"])
             self.ui.tableView_2.setModel(self.playlist_model)
             
             # 调整列宽
@@ -503,6 +710,7 @@ class MainWindow(QMainWindow):
             self.ui.tableView_2.setColumnWidth(1, 200)
             self.ui.tableView_2.setColumnWidth(2, 120)
             self.ui.tableView_2.setColumnWidth(3, 80)
+            self.ui.tableView_2.setColumnWidth(4, 80)
             
             # 更新状态
             self.update_status(f"获取到 {len(songs)} 首歌曲", "playlist")
@@ -510,6 +718,11 @@ class MainWindow(QMainWindow):
             self.update_status("未获取到歌曲", "playlist")
             QMessageBox.warning(self, "警告", "未获取到歌曲，请检查网络或Cookies！")
     
+    def on_songs_enriched(self, details):
+        """歌曲详情补全后更新榜单表格"""
+        if self.playlist_model:
+            self.playlist_model.update_songs(details)
+    
     def on_get_search_results(self):
         """获取搜索歌曲按钮点击事件"""
         keyword = self.ui.lineEdit_3.text().strip()
@@ -522,19 +735,21 @@ class MainWindow(QMainWindow):
         self.ui.pushButton_4.setText("搜索中...")
         
         self.update_status(f"正在搜索: {keyword}", "search")
+        self.search_keyword = keyword
         
         # 在线程中搜索歌曲
-        QTimer.singleShot(0, lambda: self.worker.search_songs(keyword))
+        self.request_search.emit(keyword)
     
-    def on_search_results_ready(self, songs):
+    def on_search_results_ready(self, songs, has_more):
         """搜索歌曲加载完成"""
         # 恢复按钮状态
         self.ui.pushButton_4.setEnabled(True)
         self.ui.pushButton_4.setText("获取歌曲列表")
         
         if songs:
-            # 创建并设置模型
-            self.search_model = SongTableModel(songs, ["选择", "歌曲名", "歌手", "专辑", "时长"])
+            # 创建并设置模型，滚动到底部时由fetchMore请求下一页
+            self.search_model = SongTableModel(songs, ["选择", "歌曲名", "歌手", "专辑", "时长", "进度"],
+                                               fetch_more=self.request_search_more.emit, has_more=has_more)
             self.ui.tableView.setModel(self.search_model)
             
             # 调整列宽
@@ -543,6 +758,7 @@ class MainWindow(QMainWindow):
             self.ui.tableView.setColumnWidth(2, 100)
             self.ui.tableView.setColumnWidth(3, 120)
             self.ui.tableView.setColumnWidth(4, 80)
+            self.ui.tableView.setColumnWidth(5, 80)
             
             # 更新状态
             self.update_status(f"搜索到 {len(songs)} 首歌曲", "search")
@@ -550,6 +766,13 @@ class MainWindow(QMainWindow):
             self.update_status("未搜索到歌曲", "search")
             QMessageBox.warning(self, "警告", "未搜索到歌曲，请检查关键词或网络！")
     
+    def on_search_page_ready(self, keyword, songs, has_more):
+        """搜索结果的后续页加载完成"""
+        if not self.search_model or keyword != self.search_keyword:
+            return
+        self.search_model.append_songs(songs, has_more)
+        self.update_status(f"已加载 {self.search_model.rowCount()} 首歌曲", "search")
+    
     def on_download_selected_playlist(self):
         """下载选中的榜单歌曲"""
         if not self.playlist_model:
@@ -582,9 +805,10 @@ class MainWindow(QMainWindow):
         if total == 0:
             return
         
-        # 显示进度条
-        self.progress_bar.setMaximum(total)
+        # 显示进度条 (按字节推进，见on_transfer_progress)
+        self.progress_bar.setMaximum(1000)
         self.progress_bar.setValue(0)
+        self.progress_bar.setFormat(f"0/{total} 首  %p%")
         self.progress_bar.show()
         
         # 禁用按钮
@@ -595,17 +819,9 @@ class MainWindow(QMainWindow):
         
         self.update_status(f"准备下载 {total} 首歌曲", table_type)
         
-        # 逐个下载歌曲
-        for i, song in enumerate(songs):
-            self.update_status(f"正在下载: {song['name']}", table_type)
-            QTimer.singleShot(i * 1000, lambda s=song: self.worker.download_single_song(s['id'], s['name']))
-            
-            # 更新进度条
-            self.progress_bar.setValue(i + 1)
-            QApplication.processEvents()  # 处理事件，更新UI
-        
-        # 恢复按钮状态
-        QTimer.singleShot(total * 1000 + 1000, lambda: self.restore_buttons(table_type))
+        # 批量解析下载链接并并发下载，传输中由transfer_progress推进进度条和表格进度列，
+        # 全部完成后由batch_complete恢复按钮状态
+        self.request_download.emit(songs, table_type)
     
     def restore_buttons(self, table_type):
         """恢复按钮状态"""
@@ -615,6 +831,7 @@ class MainWindow(QMainWindow):
             self.ui.pushButton_5.setEnabled(True)
         
         self.progress_bar.hide()
+        self.transfer_label.hide()
     
     def on_download_complete(self, song_name, success, message):
         """单首歌曲下载完成回调"""
@@ -645,13 +862,24 @@ class MainWindow(QMainWindow):
         print(f"[{table_type}] {status}")
     
     def update_progress(self, current, total):
-        """更新进度条"""
+        """更新已完成的歌曲数"""
         if total > 0:
-            self.progress_bar.setMaximum(total)
-            self.progress_bar.setValue(current)
-            self.progress_bar.show()
-        else:
-            self.progress_bar.hide()
+            self.progress_bar.setFormat(f"{current}/{total} 首  %p%")
+    
+    def on_transfer_progress(self, table_type, snapshot):
+        """更新字节进度条、吞吐量/剩余时间和表格进度列"""
+        model = self.playlist_model if table_type == "playlist" else self.search_model
+        if model:
+            model.update_progress(snapshot['jobs'])
+        
+        if snapshot['total']:
+            self.progress_bar.setValue(snapshot['received'] * 1000 // snapshot['total'])
+        self.transfer_label.setText(
+            f"{format_bytes(snapshot['rate'])}/s  "
+            f"{format_bytes(snapshot['received'])} / {format_bytes(snapshot['total'])}  "
+            f"剩余 {format_eta(snapshot['eta'])}"
+        )
+        self.transfer_label.show()
     
     def closeEvent(self, event):
         """窗口关闭事件"""